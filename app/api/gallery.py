@@ -1,13 +1,15 @@
 # app/api/gallery.py
 
-from typing import Optional
+import asyncio
+from typing import List, Optional
+from email.utils import parsedate_to_datetime
 from functools import wraps
 from urllib.parse import urlparse
 import traceback
-import httpx
 
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel
 from starlette.concurrency import run_in_threadpool
 
 from core.logger import get_logger
@@ -15,13 +17,18 @@ from core.config import settings
 from services.ex_gallery_service import (
     get_ex_gallery_data,
     get_ex_gallery_data_by_gid,
+    get_ex_gallery_data_by_gids,
     get_ex_gallery_stats,
     get_ex_quarterly_stats,
     get_ex_top_tags,
 )
 from services.sync_service import sync_ex_favorites
 from utils.sync_lock import sync_lock
-from utils.exhentai_utils import ExHentaiUtils
+from utils.exhentai_utils import AsyncExHentaiUtils, gallery_page_cache, image_info_cache
+from utils.http_client import build_cookie_header, exhentai_async_client, exhentai_http_client
+from utils.image_cache import AsyncCacheWriter, image_cache, image_download_flight
+from utils.reader_prefetcher import reader_prefetcher
+from utils.single_flight import single_flight_stats
 
 # 延迟导入的服务，避免循环导入
 
@@ -35,9 +42,10 @@ logger = get_logger(__name__)
 # 配置常量
 DEFAULT_PAGE_SIZE = settings.DEFAULT_PAGE_SIZE
 MAX_PAGE_SIZE = settings.MAX_PAGE_SIZE
-TIMEOUT_SECONDS = settings.REQUEST_TIMEOUT
 MAX_TOP_TAGS = settings.MAX_TOP_TAGS
 CHUNK_SIZE = settings.STREAM_CHUNK_SIZE
+# 等待其他请求下载同一图片的最多轮数，每轮等待 REQUEST_TIMEOUT 秒，之后自行下载
+FLIGHT_CLAIM_ATTEMPTS = 2
 
 
 def require_exhentai_auth(func):
@@ -76,6 +84,10 @@ def require_exhentai_auth(func):
         return sync_wrapper
 
 
+class GalleryBatchRequest(BaseModel):
+    gids: List[int]
+
+
 def get_ex_cookies():
     """获取ExHentai cookies"""
     return {
@@ -85,12 +97,169 @@ def get_ex_cookies():
     }
 
 
-def get_ex_headers():
-    """获取ExHentai请求头"""
-    return {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-        "Referer": "https://exhentai.org/",
+def get_ex_utils() -> AsyncExHentaiUtils:
+    """创建使用应用级共享异步连接池的AsyncExHentaiUtils"""
+    return AsyncExHentaiUtils(get_ex_cookies(), client=exhentai_async_client)
+
+
+def is_not_modified(request: Request, entry: dict) -> bool:
+    """根据 If-None-Match / If-Modified-Since 判断客户端缓存是否仍然有效"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or entry["etag"] in [tag.strip() for tag in if_none_match.split(",")]
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(entry["last_modified"]) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def cached_image_response(request: Request, entry: dict, cache_status: str) -> Response:
+    """以文件方式返回磁盘缓存中的图片，支持条件请求与 Range"""
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET",
+        "Access-Control-Allow-Headers": "*",
+        "Cache-Control": "public, max-age=86400",
+        "ETag": entry["etag"],
+        "Last-Modified": entry["last_modified"],
+        "X-Cache": cache_status,
+    }
+    if is_not_modified(request, entry):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(entry["path"], media_type=entry["content_type"], headers=headers)
+
+
+class UpstreamStreamingResponse(StreamingResponse):
+    """
+    转发上游流的响应：响应体从未被读取（如客户端在开始传输前断开）时，生成器的 finally 不会执行，
+    因此在响应结束时无论如何都调用 on_close 释放上游连接与请求认领
+    """
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.on_close()
+
+
+async def proxy_image_response(request: Request, url: str) -> Response:
+    """
+    代理图片：命中磁盘缓存时以文件返回；否则经共享连接池流式请求上游，收到的数据块立即转发给客户端，
+    客户端读取变慢时不再继续读取上游（背压）。Range 请求原样转发，完整的 200 响应同时写入磁盘缓存。
+    同一图片已在下载时（其他代理请求或阅读器预读），等待其写入缓存后直接返回缓存文件。
+    """
+    use_cache = settings.EX_IMAGE_CACHE_ENABLED
+    if use_cache:
+        entry = await run_in_threadpool(image_cache.get, url)
+        if entry is not None:
+            return cached_image_response(request, entry, "HIT")
+
+    # 本请求持有的下载认领（claim 返回的完成信号），None 表示不写缓存或由其他请求负责下载
+    flight = None
+    if use_cache and "range" not in request.headers:
+        key = image_cache.key_for(url)
+        stale = None
+        for _ in range(FLIGHT_CLAIM_ATTEMPTS):
+            leader, done = image_download_flight.claim(key, stale)
+            if leader:
+                flight = done
+                break
+            try:
+                await asyncio.wait_for(asyncio.shield(done), timeout=settings.REQUEST_TIMEOUT)
+                stale = None
+            except asyncio.TimeoutError:
+                # 首个请求可能已失效（如响应体从未被读取），下一轮接替它的认领
+                stale = done
+            entry = await run_in_threadpool(image_cache.get, url)
+            if entry is not None:
+                return cached_image_response(request, entry, "HIT")
+
+    upstream_headers = {"Cookie": build_cookie_header(get_ex_cookies())}
+    for name in ("range", "if-range"):
+        if name in request.headers:
+            upstream_headers[name] = request.headers[name]
+
+    try:
+        upstream = await exhentai_async_client.stream(url, headers=upstream_headers)
+        if upstream.status_code >= 400:
+            await upstream.aclose()
+            upstream.raise_for_status()
+    except BaseException:
+        if flight is not None:
+            image_download_flight.release(key, flight)
+        raise
+
+    headers = {
+        "Access-Control-Allow-Origin": "*",
+        "Access-Control-Allow-Methods": "GET",
+        "Access-Control-Allow-Headers": "*",
+        "Cache-Control": "public, max-age=3600",
     }
+    for name in ("content-length", "content-range", "accept-ranges", "last-modified"):
+        if name in upstream.headers:
+            headers[name] = upstream.headers[name]
+    if "content-encoding" in upstream.headers:
+        # aiter_bytes 输出的是解码后的数据，长度与上游不一致
+        headers.pop("content-length", None)
+
+    content_type = upstream.headers.get("content-type", "image/jpeg")
+    writer = None
+    if use_cache and upstream.status_code == 200:
+        try:
+            writer = await AsyncCacheWriter.open(image_cache, url)
+        except BaseException:
+            await upstream.aclose()
+            if flight is not None:
+                image_download_flight.release(key, flight)
+            raise
+    if writer is not None:
+        headers["X-Cache"] = "MISS"
+    elif flight is not None:
+        image_download_flight.release(key, flight)
+        flight = None
+
+    completed = False
+    closed = False
+
+    async def close():
+        """关闭上游连接、提交或丢弃缓存写入并释放认领；可重复调用"""
+        nonlocal closed
+        if closed:
+            return
+        closed = True
+        try:
+            await upstream.aclose()
+            if writer is not None:
+                if completed:
+                    await writer.commit(content_type, upstream.headers.get("last-modified"))
+                else:
+                    await writer.abort()
+        finally:
+            if flight is not None:
+                image_download_flight.release(key, flight)
+
+    async def body():
+        nonlocal completed
+        try:
+            async for chunk in upstream.aiter_bytes(CHUNK_SIZE):
+                if writer is not None:
+                    await writer.write(chunk)
+                yield chunk
+            completed = True
+        finally:
+            await close()
+
+    return UpstreamStreamingResponse(
+        body(), on_close=close, status_code=upstream.status_code, media_type=content_type, headers=headers
+    )
 
 
 def validate_image_url(url: str, allowed_domains: tuple) -> bool:
@@ -124,14 +293,14 @@ def get_gallery(
 
 
 @router.post("/sync")
-async def sync_now():
+async def sync_now(full: bool = Query(False, description="强制全量同步")):
     """
     同步ExHentai收藏数据
     """
     if sync_lock.locked():
         raise HTTPException(status_code=409, detail="已有同步任务正在进行中")
     async with sync_lock:
-        result = await run_in_threadpool(sync_ex_favorites)
+        result = await run_in_threadpool(sync_ex_favorites, incremental=False if full else None)
         return result
 
 
@@ -178,9 +347,35 @@ def get_gallery_by_gid(gid: int):
     return data
 
 
+@router.post("/items", response_model=dict)
+def get_gallery_by_gids(request: GalleryBatchRequest):
+    """
+    根据gid列表批量获取画廊信息，结果按请求顺序返回，未找到的gid列在missing中
+    """
+    if len(request.gids) > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"单次最多查询 {MAX_PAGE_SIZE} 个gid")
+    return get_ex_gallery_data_by_gids(request.gids)
+
+
+@router.get("/ex/client-status")
+def get_ex_client_status():
+    """
+    EX：共享HTTP连接池与阅读器缓存使用情况（async: 画廊路由，sync: OCR下载等同步调用）
+    """
+    return {
+        "async": exhentai_async_client.stats(),
+        "sync": exhentai_http_client.stats(),
+        "page_url_cache": gallery_page_cache.stats(),
+        "image_info_cache": image_info_cache.stats(),
+        "prefetch": reader_prefetcher.stats(),
+        "image_cache": image_cache.stats(),
+        "single_flight": single_flight_stats(),
+    }
+
+
 @router.get("/ex/thumbnails/{gid}/{token}")
 @require_exhentai_auth
-def get_ex_gallery_thumbnails(gid: str, token: str, page: int = Query(0, ge=0, description="页码，从0开始")):
+async def get_ex_gallery_thumbnails(gid: str, token: str, page: int = Query(0, ge=0, description="页码，从0开始")):
     """
     EX：获取画廊缩略图数据
 
@@ -190,8 +385,8 @@ def get_ex_gallery_thumbnails(gid: str, token: str, page: int = Query(0, ge=0, d
         page: 页码，从0开始
     """
     try:
-        utils = ExHentaiUtils("https://exhentai.org/favorites.php", get_ex_cookies())
-        result = utils.fetch_gallery_thumbnails(gid, token, page)
+        utils = get_ex_utils()
+        result = await utils.fetch_gallery_thumbnails(gid, token, page)
 
         if "error" in result:
             raise HTTPException(status_code=500, detail=result["error"])
@@ -207,7 +402,7 @@ def get_ex_gallery_thumbnails(gid: str, token: str, page: int = Query(0, ge=0, d
 
 @router.get("/ex/full-image/{gid}/{token}/{page}")
 @require_exhentai_auth
-def get_ex_full_image(gid: str, token: str, page: int):
+async def get_ex_full_image(gid: str, token: str, page: int):
     """
     EX：获取画廊大图信息
 
@@ -221,12 +416,14 @@ def get_ex_full_image(gid: str, token: str, page: int):
         raise HTTPException(status_code=400, detail="页码必须大于等于1")
 
     try:
-        utils = ExHentaiUtils("https://exhentai.org/favorites.php", get_ex_cookies())
-        result = utils.fetch_full_image(gid, token, page)
+        utils = get_ex_utils()
+        result = await utils.fetch_full_image(gid, token, page)
 
         if "error" in result and result["error"]:
             raise HTTPException(status_code=500, detail=result["error"])
 
+        # 后台预读后续页面
+        reader_prefetcher.schedule(utils, gid, token, page, result.get("totalPages", 0))
         return result
 
     except HTTPException:
@@ -238,7 +435,7 @@ def get_ex_full_image(gid: str, token: str, page: int):
 
 @router.get("/ex/proxy-image")
 @require_exhentai_auth
-async def proxy_ex_image(url: str):
+async def proxy_ex_image(url: str, request: Request):
     """
     EX：代理图片请求，解决CORS问题
     """
@@ -247,31 +444,7 @@ async def proxy_ex_image(url: str):
         raise HTTPException(status_code=400, detail="无效的图片URL域名")
 
     try:
-        async with httpx.AsyncClient(timeout=TIMEOUT_SECONDS) as client:
-            response = await client.get(
-                url, 
-                cookies=get_ex_cookies(), 
-                headers=get_ex_headers()
-            )
-            response.raise_for_status()
-
-            # 获取内容类型
-            content_type = response.headers.get("content-type", "image/jpeg")
-
-            def generate():
-                for chunk in response.iter_bytes(chunk_size=CHUNK_SIZE):
-                    yield chunk
-
-            return StreamingResponse(
-                generate(),
-                media_type=content_type,
-                headers={
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "GET",
-                    "Access-Control-Allow-Headers": "*",
-                    "Cache-Control": "public, max-age=3600",
-                },
-            )
+        return await proxy_image_response(request, url)
 
     except HTTPException:
         raise
@@ -282,19 +455,19 @@ async def proxy_ex_image(url: str):
 
 @router.get("/ex/{gid}/{token}/image/{page}")
 @require_exhentai_auth
-async def get_ex_manga_page_image(gid: str, token: str, page: int):
+async def get_ex_manga_page_image(gid: str, token: str, page: int, request: Request):
     """
     EX：获取漫画页面图片（用于自动翻译）
     """
     try:
         # 首先获取完整图片信息
-        utils = ExHentaiUtils("https://exhentai.org/favorites.php", get_ex_cookies())
-        image_info = utils.fetch_full_image(gid, token, page)
+        utils = get_ex_utils()
+        image_info = await utils.fetch_full_image(gid, token, page)
         
         if "error" in image_info:
             raise HTTPException(status_code=500, detail=image_info["error"])
         
-        image_url = image_info.get("image_url")
+        image_url = image_info.get("imageUrl")
         if not image_url:
             raise HTTPException(status_code=404, detail="图片URL未找到")
 
@@ -303,26 +476,7 @@ async def get_ex_manga_page_image(gid: str, token: str, page: int):
             raise HTTPException(status_code=400, detail="无效的图片URL")
 
         # 代理图片请求
-        async with httpx.AsyncClient(timeout=TIMEOUT_SECONDS) as client:
-            response = await client.get(
-                image_url, 
-                cookies=get_ex_cookies(), 
-                headers=get_ex_headers()
-            )
-            response.raise_for_status()
-
-            def generate():
-                for chunk in response.iter_bytes(chunk_size=CHUNK_SIZE):
-                    yield chunk
-
-            return StreamingResponse(
-                generate(),
-                media_type=response.headers.get("content-type", "image/jpeg"),
-                headers={
-                    "Access-Control-Allow-Origin": "*",
-                    "Cache-Control": "public, max-age=3600",
-                }
-            )
+        return await proxy_image_response(request, image_url)
 
     except HTTPException:
         raise
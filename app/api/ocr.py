@@ -1,222 +1,39 @@
 # app/api/ocr.py
 
-import math
-import os
-import tempfile
+import json
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional
 
-import requests
 from core.config import settings
 from core.logger import get_logger
 from fastapi import APIRouter, HTTPException
-from PIL import Image
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from services.ocr_job_service import ocr_job_manager
+from services.ocr_service import (
+    OCRQueueFullError,
+    OCRUnavailableError,
+    download_image,
+    ocr_worker_pool,
+    paddleocr_available,
+)
+from starlette.concurrency import run_in_threadpool
+from utils.dialog_merger import merge_dialogs_in_reading_order
+from utils.ocr_result_cache import ocr_result_cache
+from utils.translation_cache import prompt_version, translation_cache
 
 # 获取logger
 logger = get_logger(__name__)
 
-# 只有在PaddleOCR启用时才导入
-paddleocr_available = False
-try:
-    if settings.PADDLE_OCR_ENABLED:
-        from paddleocr import PaddleOCR
-
-        paddleocr_available = True
-        logger.info("PaddleOCR导入成功")
-    else:
-        logger.info("PaddleOCR功能已禁用，跳过导入")
-except ImportError as e:
-    logger.warning(f"PaddleOCR未安装或导入失败: {e}")
+# PaddleOCR 只在 OCR 工作进程中导入，这里只检查是否可用
+if not settings.PADDLE_OCR_ENABLED:
+    logger.info("PaddleOCR功能已禁用，跳过导入")
+elif not paddleocr_available:
+    logger.warning("PaddleOCR未安装")
     logger.warning("请安装PaddleOCR: pip install paddlepaddle paddleocr")
-except Exception as e:
-    logger.error(f"PaddleOCR导入出错: {e}")
-    logger.error("这通常是Python版本兼容性问题，建议使用Python 3.9+")
 
 router = APIRouter()
 
-# OCR 实例缓存
-ocr_engines: Dict[str, Any] = {}
-
-
-class Rectangular:
-    """矩形类，用于碰撞检测"""
-
-    def __init__(self, x: float, y: float, w: float, h: float):
-        self.x0 = x
-        self.y0 = y
-        self.x1 = x + w
-        self.y1 = y + h
-        self.w = w
-        self.h = h
-
-    def collision(self, r2) -> bool:
-        """检测与另一个矩形是否碰撞"""
-        return self.x0 < r2.x1 and self.y0 < r2.y1 and self.x1 > r2.x0 and self.y1 > r2.y0
-
-    def distance_to(self, other) -> float:
-        """计算到另一个矩形的距离"""
-        center1_x = (self.x0 + self.x1) / 2
-        center1_y = (self.y0 + self.y1) / 2
-        center2_x = (other.x0 + other.x1) / 2
-        center2_y = (other.y0 + other.y1) / 2
-
-        return math.sqrt((center1_x - center2_x) ** 2 + (center1_y - center2_y) ** 2)
-
-    def expand(self, expand_ratio: float = 1.5):
-        """扩展矩形区域"""
-        expand_w = self.w * expand_ratio - self.w
-        expand_h = self.h * expand_ratio - self.h
-
-        return Rectangular(self.x0 - expand_w / 2, self.y0 - expand_h / 2, self.w + expand_w, self.h + expand_h)
-
-
-class DialogMerger:
-    """对话框合并器"""
-
-    def __init__(self, expand_ratio: float = 1.2, max_distance: float = 30.0, min_group_size: int = 2):
-        self.expand_ratio = expand_ratio
-        self.max_distance = max_distance
-        self.min_group_size = min_group_size
-
-    @staticmethod
-    def bbox_to_rect(bbox: List[float]) -> Rectangular:
-        """将bbox [x1, y1, x2, y2] 转换为矩形对象"""
-        x1, y1, x2, y2 = bbox
-        return Rectangular(x1, y1, x2 - x1, y2 - y1)
-
-    def _find_nearby_texts(self, rect: Rectangular, all_rects: List[Tuple[Rectangular, int]], used_indices: set) -> List[int]:
-        """查找附近的文本框"""
-        nearby_indices = []
-        expanded_rect = rect.expand(expand_ratio=self.expand_ratio)
-
-        for other_rect, original_index in all_rects:
-            if original_index in used_indices:
-                continue
-
-            # 优先考虑重叠
-            if expanded_rect.collision(other_rect):
-                nearby_indices.append(original_index)
-            elif rect.distance_to(other_rect) <= self.max_distance:
-                nearby_indices.append(original_index)
-
-        return nearby_indices
-
-    def _find_connected_texts(
-        self, current_rect: Rectangular, rectangles: List[Tuple[Rectangular, int]], used_indices: set, current_group: List[int]
-    ):
-        """递归查找相邻的文本框"""
-        nearby_indices = self._find_nearby_texts(current_rect, rectangles, used_indices)
-
-        for nearby_idx in nearby_indices:
-            if nearby_idx not in used_indices:
-                current_group.append(nearby_idx)
-                used_indices.add(nearby_idx)
-
-                # 递归查找与新加入文本框相邻的文本框
-                nearby_rect = next(r for r, idx in rectangles if idx == nearby_idx)
-                self._find_connected_texts(nearby_rect, rectangles, used_indices, current_group)
-
-    def merge_ocr_results(self, ocr_results: List[Dict]) -> List[Dict]:
-        """
-        合并OCR识别结果中的对话框
-
-        Args:
-            ocr_results: OCR结果列表，每个元素包含text, confidence, bbox
-
-        Returns:
-            合并后的结果列表
-        """
-        if not ocr_results:
-            return []
-
-        logger.info(f"开始合并对话框，原始文本区域数量: {len(ocr_results)}")
-
-        # 转换为矩形对象
-        rectangles = []
-        for i, result in enumerate(ocr_results):
-            rect = self.bbox_to_rect(result["bbox"])
-            rectangles.append((rect, i))
-
-        # 按面积排序，从大到小处理
-        rectangles.sort(key=lambda x: x[0].w * x[0].h, reverse=True)
-
-        # 合并逻辑
-        merged_groups = []
-        used_indices = set()
-
-        for rect, original_index in rectangles:
-            if original_index in used_indices:
-                continue
-
-            # 创建新的群组
-            current_group = [original_index]
-            used_indices.add(original_index)
-
-            # 递归查找相邻的文本框
-            self._find_connected_texts(rect, rectangles, used_indices, current_group)
-
-            # 保留所有群组
-            merged_groups.append(current_group)
-
-        # 创建合并后的结果
-        merged_results = []
-
-        for group_indices in merged_groups:
-            if len(group_indices) >= self.min_group_size:
-                # 对话框合并：按从右到左排序文字
-                group_data = []
-                for idx in group_indices:
-                    result = ocr_results[idx]
-                    bbox = result["bbox"]
-                    center_x = (bbox[0] + bbox[2]) / 2
-                    group_data.append((idx, center_x, result))
-
-                # 按x坐标从右到左排序（x值大的在前）
-                group_data.sort(key=lambda x: x[1], reverse=True)
-
-                # 合并文字（用空格连接）
-                merged_text = " ".join([item[2]["text"] for item in group_data])
-                merged_confidence = sum([item[2]["confidence"] for item in group_data]) / len(group_data)
-
-                # 计算合并后的边界框
-                all_x = [item[2]["bbox"][0] for item in group_data] + [item[2]["bbox"][2] for item in group_data]
-                all_y = [item[2]["bbox"][1] for item in group_data] + [item[2]["bbox"][3] for item in group_data]
-
-                merged_bbox = [min(all_x), min(all_y), max(all_x), max(all_y)]
-
-                merged_results.append(
-                    {
-                        "text": merged_text,
-                        "confidence": merged_confidence,
-                        "bbox": merged_bbox,
-                        "is_merged": True,
-                        "original_count": len(group_indices),
-                        "original_texts": [item[2]["text"] for item in group_data],
-                    }
-                )
-            else:
-                # 单独的文本框
-                for idx in group_indices:
-                    result = ocr_results[idx]
-                    merged_results.append(
-                        {
-                            "text": result["text"],
-                            "confidence": result["confidence"],
-                            "bbox": result["bbox"],
-                            "is_merged": False,
-                            "original_count": 1,
-                            "original_texts": [result["text"]],
-                        }
-                    )
-
-        # 按置信度排序
-        merged_results.sort(key=lambda x: x["confidence"], reverse=True)
-
-        logger.info(f"对话框合并完成，生成 {len(merged_results)} 个文本区域")
-
-        return merged_results
-
 
 class OCRRequest(BaseModel):
     image_url: str
@@ -232,6 +49,20 @@ class OCRRequest(BaseModel):
     use_doc_unwarping: Optional[bool] = False
 
 
+class OCRJobRequest(BaseModel):
+    gid: str
+    token: str
+    start_page: int = 1
+    end_page: Optional[int] = None  # 为空时识别到最后一页
+    language: str = "ch"  # ch, en, ja, chinese_cht
+    confidence_threshold: Optional[float] = 0.0
+    # OCR 引擎参数
+    det_limit_type: Optional[str] = "max"
+    det_limit_side_len: Optional[int] = 960
+    use_doc_orientation_classify: Optional[bool] = False
+    use_doc_unwarping: Optional[bool] = False
+
+
 class BatchTranslateRequest(BaseModel):
     texts: List[str]
     source_language: str = "japan"
@@ -254,133 +85,15 @@ class OCRResponse(BaseModel):
     processing_time: Optional[float] = None
 
 
-def get_ocr_engine(request: OCRRequest) -> Any:
-    """获取或创建OCR引擎实例"""
-    if not paddleocr_available:
-        raise HTTPException(status_code=503, detail="OCR服务未启用或PaddleOCR未正确安装")
-
-    # 使用参数组合作为缓存key
-    cache_key = f"{request.language}_{request.det_limit_type}_{request.det_limit_side_len}_{request.use_doc_orientation_classify}_{request.use_doc_unwarping}"
-
-    if cache_key not in ocr_engines:
-        try:
-            logger.info(f"初始化OCR引擎，语言: {request.language}, 参数: {request.det_limit_type}_{request.det_limit_side_len}")
-            ocr_engines[cache_key] = PaddleOCR(
-                lang=request.language,
-                text_det_limit_type=request.det_limit_type,
-                text_det_limit_side_len=request.det_limit_side_len,
-                use_doc_orientation_classify=request.use_doc_orientation_classify,
-                use_doc_unwarping=request.use_doc_unwarping,
-            )
-            logger.info(f"OCR引擎初始化完成: {cache_key}")
-        except Exception as e:
-            logger.error(f"OCR引擎初始化失败 ({cache_key}): {e}")
-            raise HTTPException(status_code=500, detail=f"OCR引擎初始化失败: {str(e)}")
-
-    return ocr_engines[cache_key]
-
-
-def download_image(image_url: str) -> str:
-    """下载图片到临时文件"""
-    try:
-        # 如果是本地文件路径
-        if os.path.exists(image_url):
-            return image_url
-
-        # 检查是否是本地API的循环调用
-        if "localhost" in image_url or "127.0.0.1" in image_url:
-            # 如果是代理URL，提取原始URL
-            if "proxy-image?url=" in image_url:
-                from urllib.parse import parse_qs, unquote, urlparse
-
-                parsed = urlparse(image_url)
-                query_params = parse_qs(parsed.query)
-                if "url" in query_params:
-                    original_url = unquote(query_params["url"][0])
-                    logger.debug(f"检测到代理URL，提取原始URL: {original_url}")
-                    image_url = original_url
-                else:
-                    raise HTTPException(status_code=400, detail="无法从代理URL中提取原始图片URL")
-            else:
-                raise HTTPException(status_code=400, detail="不能从本地API下载图片，请提供外部图片URL")
-
-        # 下载网络图片
-        logger.debug(f"正在下载图片: {image_url}")
-
-        # 添加必要的请求头
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Referer": "https://exhentai.org/",
-        }
-
-        # 如果是ExHentai图片，添加认证cookies
-        cookies = None
-        if "exhentai.org" in image_url or "ehgt.org" in image_url:
-            from core.config import settings
-
-            if all(
-                [
-                    getattr(settings, "EXHENTAI_COOKIE_MEMBER_ID", None),
-                    getattr(settings, "EXHENTAI_COOKIE_PASS_HASH", None),
-                    getattr(settings, "EXHENTAI_COOKIE_IGNEOUS", None),
-                ]
-            ):
-                cookies = {
-                    "ipb_member_id": settings.EXHENTAI_COOKIE_MEMBER_ID,
-                    "ipb_pass_hash": settings.EXHENTAI_COOKIE_PASS_HASH,
-                    "igneous": settings.EXHENTAI_COOKIE_IGNEOUS,
-                }
-
-        response = requests.get(image_url, headers=headers, cookies=cookies, timeout=30, stream=True)
-        response.raise_for_status()
-
-        # 创建临时文件
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_file:
-            for chunk in response.iter_content(chunk_size=8192):
-                tmp_file.write(chunk)
-            temp_path = tmp_file.name
-
-        logger.debug(f"图片下载完成: {temp_path}")
-        return temp_path
-
-    except requests.exceptions.RequestException as e:
-        logger.error(f"图片下载失败: {e}")
-        raise HTTPException(status_code=400, detail=f"图片下载失败: {str(e)}")
-    except Exception as e:
-        logger.error(f"图片处理错误: {e}")
-        raise HTTPException(status_code=500, detail=f"图片处理错误: {str(e)}")
-
-
-def convert_image_format(image_path: str) -> str:
-    """转换不支持的图像格式为JPG"""
-    try:
-        with Image.open(image_path) as img:
-            # 检查是否需要转换
-            if img.format in ["JPEG", "JPG", "PNG", "BMP"]:
-                return image_path
-
-            # 转换为RGB模式（移除alpha通道）
-            if img.mode in ("RGBA", "LA"):
-                background = Image.new("RGB", img.size, (255, 255, 255))
-                if img.mode == "RGBA":
-                    background.paste(img, mask=img.split()[-1])
-                else:
-                    background.paste(img, mask=img.split()[-1])
-                img = background
-            elif img.mode != "RGB":
-                img = img.convert("RGB")
-
-            # 创建新的临时文件
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp_file:
-                img.save(tmp_file, "JPEG", quality=95)
-                converted_path = tmp_file.name
-
-            logger.debug(f"图像格式转换完成: {image_path} -> {converted_path}")
-            return converted_path
-
-    except Exception as e:
-        logger.error(f"图像格式转换失败: {e}")
-        return image_path  # 返回原路径，让OCR尝试处理
+def ocr_engine_params(request) -> Dict[str, Any]:
+    """OCR引擎参数，加载相同模型的参数组合在工作进程中共用一个引擎实例"""
+    return {
+        "language": request.language,
+        "det_limit_type": request.det_limit_type,
+        "det_limit_side_len": request.det_limit_side_len,
+        "use_doc_orientation_classify": request.use_doc_orientation_classify,
+        "use_doc_unwarping": request.use_doc_unwarping,
+    }
 
 
 @router.post("/recognize", response_model=OCRResponse)
@@ -391,83 +104,24 @@ async def recognize_text(request: OCRRequest):
     if not settings.PADDLE_OCR_ENABLED:
         raise HTTPException(status_code=503, detail="PaddleOCR服务已禁用")
 
-    temp_files = []
+    if not paddleocr_available:
+        raise HTTPException(status_code=503, detail="OCR服务未启用或PaddleOCR未正确安装")
+
     start_time = time.time()
 
     try:
-        # 获取OCR引擎
-        ocr_engine = get_ocr_engine(request)
-
-        # 下载图片
-        image_path = download_image(request.image_url)
-        if image_path != request.image_url:
-            temp_files.append(image_path)
-
-        # 转换图像格式（如果需要）
-        converted_path = convert_image_format(image_path)
-        if converted_path != image_path:
-            temp_files.append(converted_path)
-
-        # 执行OCR识别
-        logger.info(f"开始OCR识别，图片: {converted_path}, 语言: {request.language}")
-        ocr_results = ocr_engine.ocr(converted_path)
-
-        # 处理OCR结果 - 新版PaddleOCR数据格式
-        raw_results = []
-        if ocr_results and len(ocr_results) > 0:
-            result_dict = ocr_results[0]
-
-            # 获取识别文本、置信度和坐标
-            rec_texts = result_dict.get("rec_texts", [])
-            rec_scores = result_dict.get("rec_scores", [])
-            rec_polys = result_dict.get("rec_polys", [])
-
-            for i, (text, confidence, bbox_points) in enumerate(zip(rec_texts, rec_scores, rec_polys)):
-                # 过滤空文本和低置信度结果
-                if text and text.strip() and confidence >= request.confidence_threshold:
-                    # 转换bbox格式为 [x1, y1, x2, y2]
-                    x_coords = [point[0] for point in bbox_points]
-                    y_coords = [point[1] for point in bbox_points]
-                    bbox = [
-                        float(min(x_coords)),  # x1
-                        float(min(y_coords)),  # y1
-                        float(max(x_coords)),  # x2
-                        float(max(y_coords)),  # y2
-                    ]
-
-                    raw_results.append({"text": text, "confidence": confidence, "bbox": bbox})
-
-        # 使用对话框合并器处理结果
-        dialog_merger = DialogMerger()
-        merged_results = dialog_merger.merge_ocr_results(raw_results)
-
-        # 按漫画阅读顺序排序（右到左，上到下）
-        def sort_manga_reading_order(result):
-            bbox = result["bbox"]  # [x1, y1, x2, y2]
-
-            # 使用右上角坐标作为排序基准
-            right_x = bbox[2]  # x2 (右边界)
-            top_y = bbox[1]  # y1 (上边界)
-
-            # 排序键：(y坐标, -x坐标)
-            # y坐标越小越靠前（从上到下），x坐标越大越靠前（从右到左）
-            return (top_y, -right_x)
-
-        sorted_merged_results = sorted(merged_results, key=sort_manga_reading_order)
-
-        # 转换为OCRResult对象
-        results = []
-        for result in sorted_merged_results:
-            results.append(
-                OCRResult(
-                    text=result["text"],
-                    confidence=result["confidence"],
-                    bbox=result["bbox"],
-                    is_merged=result.get("is_merged", False),
-                    original_count=result.get("original_count", 1),
-                    original_texts=result.get("original_texts", [result["text"]]),
-                )
-            )
+        # 下载图片到内存（阻塞 IO，放到线程池中执行）
+        image_source = await run_in_threadpool(download_image, request.image_url)
+
+        # 在OCR工作进程中解码并识别
+        logger.info(f"开始OCR识别，图片: {request.image_url}, 语言: {request.language}")
+        raw_results = await ocr_worker_pool.recognize(
+            image_source, ocr_engine_params(request), request.confidence_threshold
+        )
+
+        # 对话框合并与排序
+        merged_results = await run_in_threadpool(merge_dialogs_in_reading_order, raw_results)
+        results = [OCRResult(**result) for result in merged_results]
 
         processing_time = time.time() - start_time
         logger.info(f"OCR识别完成，识别到 {len(results)} 个文本区域，耗时 {processing_time:.2f}s")
@@ -476,18 +130,95 @@ async def recognize_text(request: OCRRequest):
 
     except HTTPException:
         raise
+    except OCRQueueFullError as e:
+        raise HTTPException(status_code=429, detail=f"OCR服务繁忙，请稍后重试: {str(e)}", headers={"Retry-After": "5"})
+    except OCRUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"OCR识别失败: {e}")
         raise HTTPException(status_code=500, detail=f"OCR识别失败: {str(e)}")
-    finally:
-        # 清理临时文件
-        for temp_file in temp_files:
-            try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-                    logger.debug(f"已清理临时文件: {temp_file}")
-            except Exception as e:
-                logger.warning(f"清理临时文件失败 {temp_file}: {e}")
+
+
+@router.post("/jobs")
+async def submit_ocr_job(request: OCRJobRequest):
+    """
+    提交批量OCR任务：识别画廊的指定页码范围，进度通过 /ws/ocr-jobs 推送
+    """
+    if not settings.PADDLE_OCR_ENABLED:
+        raise HTTPException(status_code=503, detail="PaddleOCR服务已禁用")
+
+    if not paddleocr_available:
+        raise HTTPException(status_code=503, detail="OCR服务未启用或PaddleOCR未正确安装")
+
+    if not all([settings.EXHENTAI_COOKIE_MEMBER_ID, settings.EXHENTAI_COOKIE_PASS_HASH, settings.EXHENTAI_COOKIE_IGNEOUS]):
+        raise HTTPException(status_code=503, detail="ExHentai 认证信息未配置，请在设置页面配置 ExHentai cookies")
+
+    try:
+        job = await ocr_job_manager.submit(
+            request.gid,
+            request.token,
+            request.start_page,
+            request.end_page,
+            ocr_engine_params(request),
+            request.confidence_threshold,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return job.summary()
+
+
+@router.get("/jobs")
+async def list_ocr_jobs():
+    """
+    获取最近的批量OCR任务
+    """
+    return [job.summary() for job in reversed(ocr_job_manager.jobs.values())]
+
+
+@router.get("/jobs/{job_id}")
+async def get_ocr_job(job_id: str):
+    """
+    获取批量OCR任务状态及各页进度
+    """
+    job = ocr_job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job.detail()
+
+
+@router.get("/jobs/{job_id}/pages/{page}", response_model=OCRResponse)
+async def get_ocr_job_page(job_id: str, page: int):
+    """
+    获取批量OCR任务中已完成页面的识别结果，未完成时返回 202
+    """
+    job = ocr_job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if page not in job.pages:
+        raise HTTPException(status_code=404, detail="页码不在任务范围内")
+
+    info = job.pages[page]
+    if info["status"] == "done":
+        return OCRResponse(
+            success=True,
+            results=[OCRResult(**result) for result in info["results"]],
+            processing_time=info["processing_time"],
+        )
+    if info["status"] == "error":
+        return OCRResponse(success=False, error=info["error"])
+    return JSONResponse(status_code=202, content={"status": info["status"]})
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_ocr_job(job_id: str):
+    """
+    取消批量OCR任务，已完成页面的结果保留
+    """
+    job = ocr_job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return {"job_id": job_id, "cancelled": True}
 
 
 def map_language_code(lang_code: str, to_translation_service: bool = True):
@@ -507,20 +238,8 @@ def map_language_code(lang_code: str, to_translation_service: bool = True):
         return translation_to_ocr.get(lang_code, lang_code)
 
 
-async def translate_japanese_to_chinese_batch(texts: List[str]) -> List[str]:
-    """
-    日译中专用批量翻译函数
-    """
-    import json
-
-    try:
-        from services.translation_service import translation_service
-
-        # 构造输入JSON格式
-        input_data = {str(i + 1): text for i, text in enumerate(texts)}
-
-        # 构造日译中专用prompt
-        manga_translation_prompt = """**你的身份**
+# 日译中漫画批量翻译 Prompt，末尾追加 {id: 原文} 形式的 JSON
+MANGA_TRANSLATION_PROMPT = """**你的身份**
 
 * 你是"日→中漫画翻译 agent"。你的唯一目标：在理解语境的前提下，把可能含有 OCR 错误的日文文本**纠正后**准确翻译为自然流畅的**简体中文**。
 * 不进行创作与删改，不做剧透或点评，不自行审查或弱化用词；只做纠错与忠实翻译。若平台政策必须约束内容，请在不改变核心意义的前提下采用中性表达，而非删减。
@@ -607,68 +326,92 @@ async def translate_japanese_to_chinese_batch(texts: List[str]) -> List[str]:
 
 请翻译以下日文文本内容：
 
-""" + json.dumps(
-            input_data, ensure_ascii=False
-        )
-
-        # 调用翻译服务
-        logger.info(f"开始日译中翻译，文本数量: {len(texts)}")
-        result = translation_service.translate_batch_with_prompt(manga_translation_prompt)
+"""
 
-        # 检查翻译是否成功
-        if not result.get("success", False):
-            error_msg = result.get("error", "翻译服务调用失败")
-            logger.error(f"翻译服务调用失败: {error_msg}")
-            return texts  # 返回原文
 
-        # 解析返回的JSON结果
-        translation_text = result.get("translation", "{}")
+def _parse_translation_json(translation_text: str) -> Optional[Dict[str, Any]]:
+    """解析模型返回的 JSON 译文，兼容 markdown 代码块和前后多余的说明文字，失败返回 None"""
+    # 清理响应文本，移除可能的markdown代码块标记
+    cleaned_text = translation_text.strip()
+    if cleaned_text.startswith("```json"):
+        cleaned_text = cleaned_text.replace("```json", "").replace("```", "").strip()
+    elif cleaned_text.startswith("```"):
+        cleaned_text = cleaned_text.replace("```", "").strip()
 
+    try:
+        translation_json = json.loads(cleaned_text)
+    except json.JSONDecodeError as e:
+        logger.error(f"解析翻译结果JSON失败: {e}, 原始响应: {translation_text}")
+        # 寻找JSON结构
+        start_idx = translation_text.find("{")
+        end_idx = translation_text.rfind("}") + 1
+        if start_idx < 0 or end_idx <= start_idx:
+            return None
         try:
-            # 清理响应文本，移除可能的markdown代码块标记
-            cleaned_text = translation_text.strip()
-            if cleaned_text.startswith("```json"):
-                cleaned_text = cleaned_text.replace("```json", "").replace("```", "").strip()
-            elif cleaned_text.startswith("```"):
-                cleaned_text = cleaned_text.replace("```", "").strip()
-
-            # 尝试解析JSON响应
-            translation_json = json.loads(cleaned_text)
-
-            # 按顺序提取翻译结果
-            translations = []
-            for i in range(len(texts)):
-                key = str(i + 1)
-                translation = translation_json.get(key, texts[i])  # 如果没有对应翻译，使用原文
-                translations.append(translation)
-
-            logger.info(f"日译中翻译完成，成功翻译 {len(translations)} 个文本")
-            return translations
-
-        except json.JSONDecodeError as e:
-            logger.error(f"解析翻译结果JSON失败: {e}, 原始响应: {translation_text}")
-            # JSON解析失败，尝试提取可能的JSON内容
-            try:
-                # 寻找JSON结构
-                start_idx = translation_text.find("{")
-                end_idx = translation_text.rfind("}") + 1
-                if start_idx >= 0 and end_idx > start_idx:
-                    json_part = translation_text[start_idx:end_idx]
-                    translation_json = json.loads(json_part)
-
-                    translations = []
-                    for i in range(len(texts)):
-                        key = str(i + 1)
-                        translation = translation_json.get(key, texts[i])
-                        translations.append(translation)
-
-                    logger.info(f"从响应中提取JSON成功，翻译 {len(translations)} 个文本")
-                    return translations
-            except:
-                pass
-
-            # 完全解析失败，返回原文
-            return texts
+            translation_json = json.loads(translation_text[start_idx:end_idx])
+        except json.JSONDecodeError:
+            return None
+        logger.info("从响应中提取JSON成功")
+
+    return translation_json if isinstance(translation_json, dict) else None
+
+
+async def translate_japanese_to_chinese_batch(texts: List[str]) -> List[str]:
+    """
+    日译中专用批量翻译函数
+
+    先查译文缓存，只把未命中的文本（去重后）发送给模型，再按 id 拼回原顺序；
+    翻译失败的文本返回原文，且不写入缓存
+    """
+    try:
+        from services.translation_service import translation_service
+
+        version = prompt_version(MANGA_TRANSLATION_PROMPT)
+        keys = [
+            translation_cache.make_key(text, translation_service.model_name, version, "zh") for text in texts
+        ]
+        cached = await run_in_threadpool(translation_cache.get_many, keys)
+
+        # 未命中的文本去重后编号，同一句话只翻译一次
+        pending = {}
+        for text, key in zip(texts, keys):
+            if key is not None and key not in cached and key not in pending:
+                pending[key] = text
+
+        translated = dict(cached)
+        if pending:
+            # 构造输入JSON格式
+            pending_keys = list(pending)
+            input_data = {str(i + 1): pending[key] for i, key in enumerate(pending_keys)}
+            prompt_text = MANGA_TRANSLATION_PROMPT + json.dumps(input_data, ensure_ascii=False)
+
+            # 调用翻译服务（同步请求，放到线程池中执行，避免阻塞事件循环）
+            logger.info(f"开始日译中翻译，文本数量: {len(texts)}，缓存命中: {len(texts) - len(pending)}")
+            result = await run_in_threadpool(translation_service.translate_batch_with_prompt, prompt_text)
+
+            # 检查翻译是否成功
+            translation_json = None
+            if not result.get("success", False):
+                error_msg = result.get("error", "翻译服务调用失败")
+                logger.error(f"翻译服务调用失败: {error_msg}")
+            else:
+                translation_json = _parse_translation_json(result.get("translation", "{}"))
+
+            if translation_json:
+                fresh = {}
+                for i, key in enumerate(pending_keys):
+                    translation = translation_json.get(str(i + 1))
+                    if isinstance(translation, str) and translation.strip():
+                        fresh[key] = (pending[key], translation)
+                await run_in_threadpool(translation_cache.set_many, fresh)
+                translated.update((key, translation) for key, (_, translation) in fresh.items())
+        else:
+            logger.info(f"日译中翻译全部命中缓存，文本数量: {len(texts)}")
+
+        # 如果没有对应翻译，使用原文
+        translations = [translated.get(key, text) if key is not None else text for text, key in zip(texts, keys)]
+        logger.info(f"日译中翻译完成，成功翻译 {sum(key in translated for key in keys)} 个文本")
+        return translations
 
     except Exception as e:
         logger.error(f"日译中翻译失败: {e}")
@@ -719,6 +462,15 @@ async def get_ocr_status():
     return {
         "paddle_ocr_enabled": settings.PADDLE_OCR_ENABLED,
         "paddleocr_available": paddleocr_available,
-        "active_engines": list(ocr_engines.keys()),
+        "ready": ocr_worker_pool.ready,
+        "warm_up": ocr_worker_pool.warm_up,
+        "active_engines": sorted({key for worker in ocr_worker_pool.engine_stats.values() for key in worker["engines"]}),
+        "worker_pool": ocr_worker_pool.stats(),
+        "engine_pool": ocr_worker_pool.engine_pool_stats(),
+        "result_cache": ocr_result_cache.stats(),
+        "jobs": {
+            "total": len(ocr_job_manager.jobs),
+            "running": sum(1 for job in ocr_job_manager.jobs.values() if job.status in ("queued", "running")),
+        },
         "supported_languages": ["ch", "en", "japan", "chinese_cht"],
     }
@@ -4,6 +4,7 @@ from fastapi import APIRouter, WebSocket
 
 router = APIRouter()
 active_connections: List[WebSocket] = []
+ocr_job_connections: List[WebSocket] = []
 
 
 @router.websocket("/ws/logs")
@@ -17,3 +18,26 @@ async def websocket_logs(websocket: WebSocket):
         pass
     finally:
         active_connections.remove(websocket)
+
+
+@router.websocket("/ws/ocr-jobs")
+async def websocket_ocr_jobs(websocket: WebSocket):
+    """批量OCR任务的进度事件（JSON）"""
+    await websocket.accept()
+    ocr_job_connections.append(websocket)
+    try:
+        while True:
+            await websocket.receive_text()  # 保持连接
+    except Exception:
+        pass
+    finally:
+        ocr_job_connections.remove(websocket)
+
+
+async def broadcast_json(connections: List[WebSocket], message: dict):
+    """向指定频道的所有活跃连接发送 JSON 消息"""
+    for conn in list(connections):
+        try:
+            await conn.send_json(message)
+        except Exception:
+            pass  # 忽略发送失败
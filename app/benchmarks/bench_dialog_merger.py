@@ -0,0 +1,128 @@
+# app/benchmarks/bench_dialog_merger.py
+"""
+对话框合并基准。
+
+在合成的长条漫画页面（50～5000 个文本框）上对比旧实现（每次查找邻居扫描全部文本框、递归遍历）
+与当前的网格索引 + 迭代遍历，输出每页耗时，并校验两者的分组结果完全一致。
+旧实现在文本框较多时耗时过长或超出递归深度，超过 LEGACY_MAX_BOXES 后不再运行。
+
+在 app 目录下运行：
+    python -m benchmarks.bench_dialog_merger
+"""
+
+import os
+import random
+import sys
+import time
+
+BOX_COUNTS = [50, 200, 500, 1000, 2000, 5000]
+LEGACY_MAX_BOXES = 1000
+PAGE_WIDTH = 800
+
+
+def synthetic_page(box_count: int, seed: int = 42) -> list:
+    """
+    生成长条漫画页面的 OCR 结果：多数文本框为竖排对话框中相邻的几列文字，其余为零散的短文本
+    """
+    rng = random.Random(seed)
+    results = []
+    y = 0.0
+    while len(results) < box_count:
+        y += rng.uniform(40, 400)
+        if rng.random() < 0.75:
+            # 对话框：2～6 列竖排文字从右到左排列
+            columns = rng.randint(2, 6)
+            x = rng.uniform(100, PAGE_WIDTH - 40)
+            top = y + rng.uniform(0, 20)
+            for _ in range(columns):
+                w = rng.uniform(18, 30)
+                h = rng.uniform(60, 260)
+                results.append({"text": f"t{len(results)}", "confidence": rng.uniform(0.5, 1.0), "bbox": [x, top, x + w, top + h]})
+                x -= w + rng.uniform(2, 10)
+        else:
+            # 零散文本（拟声词、旁白等）
+            x = rng.uniform(0, PAGE_WIDTH - 120)
+            w = rng.uniform(20, 120)
+            h = rng.uniform(20, 120)
+            results.append({"text": f"t{len(results)}", "confidence": rng.uniform(0.5, 1.0), "bbox": [x, y, x + w, y + h]})
+    return results[:box_count]
+
+
+def build_legacy_merger(base):
+    class LegacyDialogMerger(base):
+        """旧实现：每次查找邻居都扫描全部文本框，并递归遍历"""
+
+        def _legacy_nearby(self, rect, all_rects, used_indices):
+            nearby_indices = []
+            expanded_rect = rect.expand(expand_ratio=self.expand_ratio)
+            for other_rect, original_index in all_rects:
+                if original_index in used_indices:
+                    continue
+                if expanded_rect.collision(other_rect):
+                    nearby_indices.append(original_index)
+                elif rect.distance_to(other_rect) <= self.max_distance:
+                    nearby_indices.append(original_index)
+            return nearby_indices
+
+        def _legacy_connected(self, current_rect, rectangles, used_indices, current_group):
+            for nearby_idx in self._legacy_nearby(current_rect, rectangles, used_indices):
+                if nearby_idx not in used_indices:
+                    current_group.append(nearby_idx)
+                    used_indices.add(nearby_idx)
+                    nearby_rect = next(r for r, idx in rectangles if idx == nearby_idx)
+                    self._legacy_connected(nearby_rect, rectangles, used_indices, current_group)
+
+        def group_texts(self, ocr_results):
+            rectangles = [(self.bbox_to_rect(result["bbox"]), i) for i, result in enumerate(ocr_results)]
+            rectangles.sort(key=lambda x: x[0].w * x[0].h, reverse=True)
+            merged_groups = []
+            used_indices = set()
+            for rect, original_index in rectangles:
+                if original_index in used_indices:
+                    continue
+                current_group = [original_index]
+                used_indices.add(original_index)
+                self._legacy_connected(rect, rectangles, used_indices, current_group)
+                merged_groups.append(current_group)
+            return merged_groups
+
+    return LegacyDialogMerger()
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from utils.dialog_merger import DialogMerger
+
+    merger = DialogMerger()
+    legacy = build_legacy_merger(DialogMerger)
+
+    print(f"{'boxes':>6} | {'groups':>6} | {'legacy ms':>10} | {'grid ms':>10} | {'speedup':>8} | identical")
+    print("-" * 66)
+    for box_count in BOX_COUNTS:
+        page = synthetic_page(box_count)
+        groups, grid_ms = timed(merger.group_texts, page)
+
+        legacy_cell = "skipped"
+        speedup_cell = "-"
+        identical = "-"
+        if box_count <= LEGACY_MAX_BOXES:
+            try:
+                legacy_groups, legacy_ms = timed(legacy.group_texts, page)
+            except RecursionError:
+                legacy_cell = "RecursionError"
+            else:
+                legacy_cell = f"{legacy_ms:.1f}"
+                speedup_cell = f"{legacy_ms / grid_ms:.1f}x"
+                identical = str(legacy_groups == groups)
+
+        print(f"{box_count:>6} | {len(groups):>6} | {legacy_cell:>10} | {grid_ms:>10.1f} | {speedup_cell:>8} | {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# app/benchmarks/bench_gallery_listing.py
+"""
+图库列表接口的单次请求内存分配基准。
+
+对比旧实现（copy.deepcopy 每个条目）与当前的浅层投影，
+输出不同 per_page 下每次请求新分配的内存与耗时。
+
+在 app 目录下运行：
+    python -m benchmarks.bench_gallery_listing
+"""
+
+import copy
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ITEM_COUNT = 20000
+PER_PAGE_VALUES = [10, 25, 50, 100]
+ROUNDS = 200
+
+NAMESPACES = ["female", "male", "artist", "group", "parody", "character", "language", "other"]
+CATEGORIES = ["Doujinshi", "Manga", "Artist CG", "Game CG", "Non-H", "Image Set", "Cosplay", "Misc"]
+
+
+def build_fixtures(directory: str):
+    """生成合成的图库数据与标签翻译数据，避免依赖真实数据和网络下载"""
+    rng = random.Random(42)
+    vocab = {ns: [f"{ns}value{i}" for i in range(300)] for ns in NAMESPACES}
+
+    tag_db = {
+        "data": [
+            {
+                "namespace": ns,
+                "data": {
+                    value: {"name": f"{value}_cn", "intro": f"intro of {value}", "links": ""} for value in values
+                },
+            }
+            for ns, values in vocab.items()
+        ]
+    }
+
+    gallery = []
+    for gid in range(ITEM_COUNT):
+        tags = [f"{ns}:{rng.choice(vocab[ns])}" for ns in rng.choices(NAMESPACES, k=30)]
+        gallery.append(
+            {
+                "gid": gid,
+                "token": f"{gid:010x}",
+                "title": f"[Circle {gid % 97}] Sample Gallery Title {gid}",
+                "title_jpn": f"サンプル作品 {gid}",
+                "category": rng.choice(CATEGORIES),
+                "thumb": f"https://ehgt.org/t/{gid:08x}.jpg",
+                "uploader": f"uploader{gid % 311}",
+                "posted": str(1500000000 + gid * 3600),
+                "filecount": str(rng.randint(10, 400)),
+                "filesize": rng.randint(1 << 20, 1 << 29),
+                "expunged": False,
+                "rating": f"{rng.uniform(1, 5):.2f}",
+                "torrentcount": "1",
+                "torrents": [{"hash": f"{gid:040x}", "added": "1500000000", "name": "sample.zip", "tsize": "1024", "fsize": "2048"}],
+                "tags": tags,
+            }
+        )
+
+    gallery_path = os.path.join(directory, "gallery.json")
+    tag_path = os.path.join(directory, "db.text.json")
+    with open(gallery_path, "w", encoding="utf-8") as f:
+        json.dump(gallery, f, ensure_ascii=False)
+    with open(tag_path, "w", encoding="utf-8") as f:
+        json.dump(tag_db, f, ensure_ascii=False)
+    return gallery_path, tag_path
+
+
+def legacy_listing(service, page: int, per_page: int):
+    """旧实现：对返回的每个条目做深拷贝后再替换 tags"""
+    start, end = (page - 1) * per_page, page * per_page
+    results = []
+    for item in service.ex_gallery_data[start:end]:
+        item_copy = copy.deepcopy(item)
+        item_copy["tags"] = service.enrich_tags(item_copy.get("tags", []))
+        results.append(item_copy)
+    return {"page": page, "per_page": per_page, "total": len(service.ex_gallery_data), "results": results}
+
+
+def measure(func, per_page: int):
+    """返回 (每次请求分配的字节数, 每次请求耗时毫秒)"""
+    pages = ITEM_COUNT // per_page
+
+    # 预热（填充按 gid 的标签缓存等）
+    for page in range(1, pages + 1):
+        func(page, per_page)
+
+    tracemalloc.start()
+    total_bytes = 0
+    for i in range(ROUNDS):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = func(i % pages + 1, per_page)
+        _, peak = tracemalloc.get_traced_memory()
+        total_bytes += peak - before
+        del result
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for i in range(ROUNDS):
+        func(i % pages + 1, per_page)
+    elapsed = time.perf_counter() - start
+
+    return total_bytes / ROUNDS, elapsed / ROUNDS * 1000
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="bench_gallery_")
+    gallery_path, tag_path = build_fixtures(workdir)
+    os.environ["GALLERY_DATA_PATH"] = gallery_path
+    os.environ["TAG_TRANSLATE_PATH"] = tag_path
+
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from services import ex_gallery_service as service
+
+    print(f"条目数: {ITEM_COUNT}, 每组请求数: {ROUNDS}")
+    print(f"{'per_page':>8} | {'deepcopy KiB/req':>16} | {'projection KiB/req':>18} | {'deepcopy ms':>11} | {'projection ms':>13}")
+    print("-" * 79)
+    for per_page in PER_PAGE_VALUES:
+        legacy_bytes, legacy_ms = measure(lambda p, n: legacy_listing(service, p, n), per_page)
+        current_bytes, current_ms = measure(lambda p, n: service.get_ex_gallery_data(p, n, None, None), per_page)
+        print(
+            f"{per_page:>8} | {legacy_bytes / 1024:>16.1f} | {current_bytes / 1024:>18.1f} | "
+            f"{legacy_ms:>11.3f} | {current_ms:>13.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
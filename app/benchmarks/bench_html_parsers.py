@@ -0,0 +1,84 @@
+# app/benchmarks/bench_html_parsers.py
+"""
+ExHentai 页面解析后端基准。
+
+对收藏夹页、画廊缩略图页和图片页分别使用各解析后端解析并提取字段，输出每页耗时，
+并校验所有后端提取出的字段完全一致：
+    lxml          lxml.html + XPath（默认）
+    html.parser   BeautifulSoup + html.parser（未安装 lxml 时的回退）
+    bs4+lxml      BeautifulSoup + lxml 树构建器（仅作对照，即此前的实现）
+
+样例页面位于 benchmarks/samples/（favorites.html、gallery.html、image.html），按真实页面结构构造，
+gid、token 与文本均为虚构；可用浏览器保存的真实页面替换。
+
+在 app 目录下运行：
+    python -m benchmarks.bench_html_parsers
+"""
+
+import os
+import sys
+import time
+
+ROUNDS = 50
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")
+
+
+def load_sample(name: str) -> bytes:
+    with open(os.path.join(SAMPLES_DIR, name), "rb") as f:
+        return f.read()
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from bs4 import BeautifulSoup
+    from utils.exhentai_utils import (
+        HTML_PARSERS,
+        parse_favorite_rows,
+        parse_favorites_next_url,
+        parse_favorites_total,
+        parse_gallery_page_links,
+        parse_gallery_thumbnails,
+        parse_html,
+        parse_image_page,
+        resolve_html_parser,
+    )
+
+    pages = {
+        "favorites": (
+            load_sample("favorites.html"),
+            lambda doc: (parse_favorite_rows(doc), parse_favorites_total(doc), parse_favorites_next_url(doc)),
+        ),
+        "gallery": (
+            load_sample("gallery.html"),
+            lambda doc: (parse_gallery_thumbnails(doc), parse_gallery_page_links(doc)),
+        ),
+        "image": (load_sample("image.html"), parse_image_page),
+    }
+
+    backends = {p: (lambda content, p=p: parse_html(content, p)) for p in HTML_PARSERS if resolve_html_parser(p) == p}
+    if "lxml" in backends:
+        backends["bs4+lxml"] = lambda content: BeautifulSoup(content, "lxml")
+
+    print(f"可用解析后端: {', '.join(backends)}，每页解析 {ROUNDS} 次")
+    print(f"{'page':>10} | " + " | ".join(f"{name + ' ms':>16}" for name in backends) + " | identical")
+    print("-" * (24 + 19 * len(backends)))
+
+    for name, (content, extract) in pages.items():
+        timings = []
+        results = []
+        for parse in backends.values():
+            start = time.perf_counter()
+            for _ in range(ROUNDS):
+                result = extract(parse(content))
+            timings.append((time.perf_counter() - start) / ROUNDS * 1000)
+            results.append(result)
+
+        identical = all(result == results[0] for result in results[1:])
+        print(f"{name:>10} | " + " | ".join(f"{t:>16.3f}" for t in timings) + f" | {identical}")
+        if not identical:
+            for backend, result in zip(backends, results):
+                print(f"  [{backend}] {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,11 @@ class Settings:
     # ExHentai 同步配置
     EX_SYNC_RETRIES = int(os.getenv("EX_SYNC_RETRIES", "5"))
     EX_RETRY_DELAY = float(os.getenv("EX_RETRY_DELAY", "2.0"))
+    EX_GDATA_WORKERS = int(os.getenv("EX_GDATA_WORKERS", "4"))
+    EX_GDATA_RATE_LIMIT = float(os.getenv("EX_GDATA_RATE_LIMIT", "2.0"))
+    EX_GDATA_BURST = int(os.getenv("EX_GDATA_BURST", "4"))
+    EX_HTML_PARSER = os.getenv("EX_HTML_PARSER", "auto")
+    EX_SYNC_INCREMENTAL = os.getenv("EX_SYNC_INCREMENTAL", "true").lower() in ("true", "1", "yes", "on")
 
     LOG_DIR = os.getenv("LOG_DIR", "logs")
     LOG_FILE = os.getenv("LOG_FILE", "app.log")
@@ -32,6 +37,10 @@ class Settings:
     TRANSLATION_BASE_URL = os.getenv("TRANSLATION_BASE_URL", "https://ark.cn-beijing.volces.com/api/v3")
     TRANSLATION_MODEL = os.getenv("TRANSLATION_MODEL", "doubao-1-5-lite-32k-250115")
     TRANSLATION_API_KEY_ENV = os.getenv("TRANSLATION_API_KEY_ENV", "ARK_API_KEY")
+    TRANSLATION_CACHE_ENABLED = os.getenv("TRANSLATION_CACHE_ENABLED", "true").lower() in ("true", "1", "yes", "on")
+    TRANSLATION_CACHE_PATH = os.getenv("TRANSLATION_CACHE_PATH", "data/translations.db")
+    TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "50000"))
+    TRANSLATION_CACHE_MEMORY_SIZE = int(os.getenv("TRANSLATION_CACHE_MEMORY_SIZE", "2048"))
     
     # 各种LLM服务商的API Key
     ARK_API_KEY = os.getenv("ARK_API_KEY")
@@ -42,6 +51,19 @@ class Settings:
     
     # OCR服务配置
     PADDLE_OCR_ENABLED = os.getenv("PADDLE_OCR_ENABLED", "false").lower() in ("true", "1", "yes", "on")
+    OCR_WORKERS = int(os.getenv("OCR_WORKERS", "1"))
+    OCR_MAX_QUEUE = int(os.getenv("OCR_MAX_QUEUE", "4"))
+    OCR_ENGINE_POOL_SIZE = int(os.getenv("OCR_ENGINE_POOL_SIZE", "2"))
+    OCR_ENGINE_MEMORY_MB = int(os.getenv("OCR_ENGINE_MEMORY_MB", "0"))
+    OCR_PRELOAD_PROFILES = os.getenv("OCR_PRELOAD_PROFILES", "")
+    OCR_JOB_DOWNLOAD_CONCURRENCY = int(os.getenv("OCR_JOB_DOWNLOAD_CONCURRENCY", "4"))
+    OCR_JOB_BATCH_SIZE = int(os.getenv("OCR_JOB_BATCH_SIZE", "4"))
+    OCR_JOB_HISTORY = int(os.getenv("OCR_JOB_HISTORY", "20"))
+    OCR_RESULT_CACHE_ENABLED = os.getenv("OCR_RESULT_CACHE_ENABLED", "true").lower() in ("true", "1", "yes", "on")
+    OCR_RESULT_CACHE_PATH = os.getenv("OCR_RESULT_CACHE_PATH", "data/ocr_results.db")
+    OCR_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("OCR_RESULT_CACHE_MAX_ENTRIES", "10000"))
+    OCR_RESULT_CACHE_MEMORY_SIZE = int(os.getenv("OCR_RESULT_CACHE_MEMORY_SIZE", "256"))
+    OCR_RESULT_CACHE_WARM_ON_STARTUP = os.getenv("OCR_RESULT_CACHE_WARM_ON_STARTUP", "false").lower() in ("true", "1", "yes", "on")
     
     # API配置项
     DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "10"))
@@ -49,7 +71,23 @@ class Settings:
     REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "30"))
     MAX_TOP_TAGS = int(os.getenv("MAX_TOP_TAGS", "100"))
     STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "8192"))
-    
+
+    # 共享HTTP连接池配置
+    EX_HTTP_POOL_SIZE = int(os.getenv("EX_HTTP_POOL_SIZE", "20"))
+    EX_HTTP_POOL_HOSTS = int(os.getenv("EX_HTTP_POOL_HOSTS", "16"))
+    EX_HTTP_CONNECT_TIMEOUT = float(os.getenv("EX_HTTP_CONNECT_TIMEOUT", "10"))
+    TAG_ENRICH_CACHE_ENABLED = os.getenv("TAG_ENRICH_CACHE_ENABLED", "true").lower() in ("true", "1", "yes", "on")
+
+    # 阅读器缓存配置
+    EX_PAGE_URL_CACHE_SIZE = int(os.getenv("EX_PAGE_URL_CACHE_SIZE", "512"))
+    EX_PAGE_URL_CACHE_TTL = float(os.getenv("EX_PAGE_URL_CACHE_TTL", "3600"))
+    EX_IMAGE_INFO_CACHE_SIZE = int(os.getenv("EX_IMAGE_INFO_CACHE_SIZE", "1024"))
+    EX_IMAGE_INFO_CACHE_TTL = float(os.getenv("EX_IMAGE_INFO_CACHE_TTL", "600"))
+    EX_PREFETCH_DEPTH = int(os.getenv("EX_PREFETCH_DEPTH", "3"))
+    EX_IMAGE_CACHE_ENABLED = os.getenv("EX_IMAGE_CACHE_ENABLED", "true").lower() in ("true", "1", "yes", "on")
+    EX_IMAGE_CACHE_PATH = os.getenv("EX_IMAGE_CACHE_PATH", "data/image_cache")
+    EX_IMAGE_CACHE_MAX_MB = int(os.getenv("EX_IMAGE_CACHE_MAX_MB", "2048"))
+
     # CORS配置
     ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "*")
 
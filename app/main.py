@@ -10,6 +10,14 @@ from api import gallery, root, settings, ocr
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from core.logger import get_logger
+from core.config import settings as app_settings
+from utils.http_client import exhentai_async_client, exhentai_http_client
+from utils.image_cache import image_cache
+from utils.ocr_result_cache import ocr_result_cache
+from utils.translation_cache import translation_cache
+from services.ocr_job_service import ocr_job_manager
+from services.ocr_service import ocr_worker_pool, paddleocr_available
+from utils.reader_prefetcher import reader_prefetcher
 
 logger = get_logger(__name__)
 
@@ -23,8 +31,23 @@ async def lifespan(app: FastAPI):
             os.makedirs(folder)
         else:
             continue
-    
-    
+
+    # 启动共享 HTTP 连接池
+    exhentai_http_client.start()
+
+    # 启动 OCR 工作进程池，并在后台预加载引擎
+    if paddleocr_available:
+        ocr_worker_pool.start()
+        ocr_worker_pool.start_warm_up()
+
+    # 加载图片磁盘缓存索引（扫描缓存目录），避免首个代理请求阻塞
+    if app_settings.EX_IMAGE_CACHE_ENABLED:
+        await asyncio.to_thread(image_cache.load)
+
+    # 预热 OCR 结果缓存
+    if ocr_result_cache.warm_on_startup:
+        await asyncio.to_thread(ocr_result_cache.warm)
+
     # 初始化翻译服务
     try:
         from services.translation_service import translation_service
@@ -40,6 +63,15 @@ async def lifespan(app: FastAPI):
 
     yield  # 继续运行应用
 
+    # 关闭时取消预读任务并释放共享连接池
+    reader_prefetcher.cancel_all()
+    ocr_job_manager.cancel_all()
+    ocr_worker_pool.shutdown()
+    ocr_result_cache.close()
+    translation_cache.close()
+    exhentai_http_client.close()
+    await exhentai_async_client.aclose()
+
 
 app = FastAPI(lifespan=lifespan)
 
@@ -1,19 +1,24 @@
 # app/services/ex_gallery_service.py
 
-import copy
 import json
 import os
-from collections import Counter, defaultdict
-from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import requests
 from core.config import settings
 from core.logger import get_logger
+from utils.gallery_search_index import GallerySearchIndex
+from utils.gallery_stats import GalleryStatsAggregate
 
 # 全局缓存变量（初始为空）
 ex_gallery_data: List[dict] = []
+ex_gallery_index = GallerySearchIndex([])
+ex_gallery_stats = GalleryStatsAggregate([])
 tag_translate_data = {}
+# "namespace:value" → 富化后的标签信息，随标签翻译数据一起构建
+tag_detail_map: Dict[str, dict] = {}
+# gid → 富化后的标签列表，图库或标签翻译数据重新加载时整体替换
+_enriched_tags_cache: Dict[int, List[dict]] = {}
 
 logger = get_logger(__name__)
 
@@ -23,21 +28,36 @@ def load_ex_gallery_data(force_reload=False):
     加载或重新加载 gallery 数据。
     如果文件不存在，则使用空数据并记录警告。
     """
-    global ex_gallery_data
-
     if not ex_gallery_data or force_reload:
         if not os.path.exists(settings.GALLERY_DATA_PATH):
             logger.warning(f"找不到图库数据文件: {settings.GALLERY_DATA_PATH}，使用空数据。")
-            ex_gallery_data = []
+            _apply_gallery_data([])
             return
 
         try:
             with open(settings.GALLERY_DATA_PATH, encoding="utf-8") as f:
-                ex_gallery_data = json.load(f)
-                logger.info(f"成功加载图库数据，共 {len(ex_gallery_data)} 项。")
+                data = json.load(f)
+                logger.info(f"成功加载图库数据，共 {len(data)} 项。")
         except json.JSONDecodeError as e:
             logger.error(f"解析图库数据文件失败: {e}")
-            ex_gallery_data = []
+            data = []
+        _apply_gallery_data(data)
+
+
+def _apply_gallery_data(data: List[dict]):
+    """
+    基于新数据构建索引后再整体替换全局引用。
+    构建期间并发请求仍读取旧的数据与索引，不会看到半成品。
+    """
+    global ex_gallery_data, ex_gallery_index, ex_gallery_stats, _enriched_tags_cache
+
+    index = GallerySearchIndex(data)
+    stats = GalleryStatsAggregate(data)
+    ex_gallery_index = index
+    ex_gallery_stats = stats
+    ex_gallery_data = data
+    _enriched_tags_cache = {}
+    logger.info(f"图库搜索索引构建完成，标题词 {len(index.title_postings)} 个，标签 {len(index.tag_postings)} 个。")
 
 
 def load_tag_translate_data(force_reload=False):
@@ -45,8 +65,6 @@ def load_tag_translate_data(force_reload=False):
     加载或重新加载标签翻译数据。
     若本地文件不存在，则自动从 GitHub 下载。
     """
-    global tag_translate_data
-
     if not tag_translate_data or force_reload:
         # 如果本地文件不存在，或强制 reload
         need_download = not os.path.exists(settings.TAG_TRANSLATE_PATH) or force_reload
@@ -67,17 +85,56 @@ def load_tag_translate_data(force_reload=False):
             except Exception as e:
                 logger.error(f"下载标签翻译数据失败: {e}")
                 if not os.path.exists(settings.TAG_TRANSLATE_PATH):
-                    tag_translate_data = {}
+                    _apply_tag_translate_data({})
                     return
 
         # 加载 JSON 数据
         try:
             with open(settings.TAG_TRANSLATE_PATH, encoding="utf-8") as f:
-                tag_translate_data = json.load(f)
+                data = json.load(f)
                 logger.info(f"成功加载标签翻译数据")
         except json.JSONDecodeError as e:
             logger.error(f"标签翻译数据解析失败: {e}")
-            tag_translate_data = {}
+            data = {}
+        _apply_tag_translate_data(data)
+
+
+def _build_tag_detail_map(data: dict) -> Dict[str, dict]:
+    """
+    将标签翻译数据展开为 "namespace:value" → 富化结果 的扁平映射。
+    同名 namespace 出现多次时以第一个为准，与原先的查找行为一致。
+    """
+    detail_map = {}
+    seen_namespaces = set()
+    for ns_item in data.get("data", []) if isinstance(data, dict) else []:
+        namespace = ns_item.get("namespace")
+        if namespace in seen_namespaces:
+            continue
+        seen_namespaces.add(namespace)
+
+        for value, tag_detail in (ns_item.get("data") or {}).items():
+            if not tag_detail:
+                continue
+            tag = f"{namespace}:{value}"
+            detail_map[tag] = {
+                "tag": tag,
+                "namespace": namespace,
+                "value": value,
+                "tag_cn": tag_detail.get("name", ""),
+                "intro": tag_detail.get("intro", ""),
+                "links": tag_detail.get("links", ""),
+            }
+    return detail_map
+
+
+def _apply_tag_translate_data(data: dict):
+    """构建标签查找表后替换全局引用，并使已缓存的富化结果失效"""
+    global tag_translate_data, tag_detail_map, _enriched_tags_cache
+
+    detail_map = _build_tag_detail_map(data)
+    tag_translate_data = data
+    tag_detail_map = detail_map
+    _enriched_tags_cache = {}
 
 
 # 初始加载
@@ -86,147 +143,114 @@ load_tag_translate_data()
 
 
 def enrich_tags(tags: List[str]) -> List[dict]:
-    enriched_tags = []
-    for tag in tags:
-        if ":" not in tag:
-            continue
-        namespace, value = tag.split(":", 1)
-        try:
-            tag_detail = next(item for item in tag_translate_data["data"] if item.get("namespace") == namespace)["data"].get(
-                value
-            )
-
-            if tag_detail:
-                enriched_tags.append(
-                    {
-                        "tag": tag,
-                        "namespace": namespace,
-                        "value": value,
-                        "tag_cn": tag_detail.get("name", ""),
-                        "intro": tag_detail.get("intro", ""),
-                        "links": tag_detail.get("links", ""),
-                    }
-                )
-        except (StopIteration, KeyError):
-            continue
-    return enriched_tags
+    """
+    将 "namespace:value" 标签列表转换为带翻译信息的字典列表，未收录的标签会被跳过。
+    返回的字典在请求间共享，调用方不要原地修改。
+    """
+    detail_map = tag_detail_map
+    return [detail_map[tag] for tag in tags if tag in detail_map]
+
+
+def get_enriched_tags(item: dict, cache: Optional[Dict[int, List[dict]]] = None):
+    """
+    获取条目富化后的标签列表，传入 cache 时按 gid 缓存结果。
+    tags 不是字符串列表时原样返回。
+    """
+    raw_tags = item.get("tags", [])
+    if not (isinstance(raw_tags, list) and all(isinstance(t, str) for t in raw_tags)):
+        return raw_tags
+    if cache is None or not settings.TAG_ENRICH_CACHE_ENABLED:
+        return enrich_tags(raw_tags)
+
+    gid = item.get("gid")
+    enriched = cache.get(gid)
+    if enriched is None:
+        enriched = enrich_tags(raw_tags)
+        cache[gid] = enriched
+    return enriched
+
+
+def project_gallery_item(item: dict, cache: Optional[Dict[int, List[dict]]] = None) -> dict:
+    """
+    构建响应用的浅层投影：只替换 tags 字段，其余字段直接引用原始数据，不做深拷贝。
+    投影与全局数据共享嵌套对象，只用于序列化输出，调用方不要原地修改。
+    """
+    view = dict(item)
+    view["tags"] = get_enriched_tags(item, cache)
+    return view
 
 
 def get_ex_gallery_data(page: int, per_page: int, keyword: Optional[str], type_: Optional[str]):
-    filtered = ex_gallery_data
-    if keyword:
-        kw = keyword.lower()
-        filtered = [
-            item for item in filtered if kw in item["title"].lower() or any(kw in tag.lower() for tag in item.get("tags", []))
-        ]
-    if type_:
-        filtered = [item for item in filtered if item["category"] == type_]
-
-    total = len(filtered)
+    # 先取缓存再取索引：重新加载时先替换索引再替换缓存，旧数据不会写入新缓存
+    cache = _enriched_tags_cache
+    # 只读取一次全局索引，保证本次请求内数据与索引一致
+    index = ex_gallery_index
     start, end = (page - 1) * per_page, (page - 1) * per_page + per_page
 
-    results = []
-    for item in filtered[start:end]:
-        item_copy = copy.deepcopy(item)
-        raw_tags = item_copy.get("tags", [])
-        if isinstance(raw_tags, list) and all(isinstance(t, str) for t in raw_tags):
-            item_copy["tags"] = enrich_tags(raw_tags)
-        results.append(item_copy)
+    if keyword or type_:
+        positions = index.search(keyword, type_)
+        total = len(positions)
+        page_items = [index.items[pos] for pos in positions[start:end]]
+    else:
+        total = len(index.items)
+        page_items = index.items[start:end]
+
+    results = [project_gallery_item(item, cache) for item in page_items]
 
     return {"page": page, "per_page": per_page, "total": total, "results": results}
 
 
 def get_ex_gallery_data_by_gid(gid: int):
-    for item in ex_gallery_data:
-        if item.get("gid") == gid:
-            item_copy = copy.deepcopy(item)
-            raw_tags = item_copy.get("tags", [])
-            if isinstance(raw_tags, list) and all(isinstance(t, str) for t in raw_tags):
-                item_copy["tags"] = enrich_tags(raw_tags)
-            return item_copy
-    return None
+    cache = _enriched_tags_cache
+    item = ex_gallery_index.by_gid.get(gid)
+    if item is None:
+        return None
+    return project_gallery_item(item, cache)
 
 
-def get_ex_gallery_stats():
+def get_ex_gallery_data_by_gids(gids: List[int]):
     """
-    返回图库总数量及每个固定分类的数量。
+    批量获取多个画廊信息，结果按传入顺序排列，未找到的 gid 放入 missing。
     """
-    fixed_categories = [
-        "Doujinshi",
-        "Manga",
-        "Artist CG",
-        "Game CG",
-        "Western",
-        "Non-H",
-        "Image Set",
-        "Cosplay",
-        "Asian Porn",
-        "Misc",
-    ]
+    cache = _enriched_tags_cache
+    by_gid = ex_gallery_index.by_gid
 
-    # 统计总数量
-    total_count = len(ex_gallery_data)
-
-    # 初始化分类统计
-    category_counts = {cat: 0 for cat in fixed_categories}
+    results = []
+    missing = []
+    for gid in gids:
+        item = by_gid.get(gid)
+        if item is None:
+            missing.append(gid)
+        else:
+            results.append(project_gallery_item(item, cache))
+    return {"results": results, "missing": missing}
 
-    # 遍历 ex_gallery_data 分类计数
-    for item in ex_gallery_data:
-        category = item.get("category")
-        if category in category_counts:
-            category_counts[category] += 1
 
-    return {"total": total_count, "categories": category_counts}
+def get_ex_gallery_stats():
+    """
+    返回图库总数量及每个固定分类的数量。
+    """
+    stats = ex_gallery_stats
+    return {"total": stats.total, "categories": dict(stats.category_counts)}
 
 
 def get_ex_quarterly_stats():
     """
-    统计每个季度的 gallery 数量。
+    统计每个季度的 gallery 数量（UTC）。
     返回格式：[{ "quarter": "2022-Q1", "count": 123 }, ...]
     """
-    stats = defaultdict(int)
-
-    for item in ex_gallery_data:
-        posted_str = item.get("posted")
-        if not posted_str:
-            continue
-        try:
-            ts = int(posted_str)
-            dt = datetime.utcfromtimestamp(ts)  # 使用 UTC 时间
-            quarter = (dt.month - 1) // 3 + 1
-            key = f"{dt.year}-Q{quarter}"
-            stats[key] += 1
-        except (ValueError, TypeError):
-            continue
-
-    # 返回排序后的结果
-    return {"data": [{"quarter": k, "count": v} for k, v in sorted(stats.items())]}
+    return {"data": ex_gallery_stats.quarterly}
 
 
 def get_ex_top_tags(n: int = 20, type_: Optional[str] = None):
-    tag_counter = Counter()
-
-    for item in ex_gallery_data:
-        tags = item.get("tags", [])
-        if not isinstance(tags, list):
-            continue
-        for tag in tags:
-            if not isinstance(tag, str):
-                continue
-            if type_:
-                if not tag.startswith(f"{type_}:"):
-                    continue
-            tag_counter[tag] += 1
-
-    # 获取最常见的前 n 个标签
-    top_tags = tag_counter.most_common(n)
+    # 直接从加载时预排序的列表中截取前 n 个标签
+    top_tags = ex_gallery_stats.most_common_tags(n, type_)
 
     # enrich_tags 要求传入 list[str]，返回 list[dict]
     enriched = enrich_tags([tag for tag, _ in top_tags])
 
-    # 将计数信息合并进 enrich_tags 的结果
+    # 将计数信息合并进 enrich_tags 的结果（复制一份，避免修改共享的查找表）
     count_map = dict(top_tags)
-    for tag in enriched:
-        tag["count"] = count_map.get(tag["tag"], 0)
+    enriched = [{**tag, "count": count_map.get(tag["tag"], 0)} for tag in enriched]
 
     return {"top_tags": enriched}
@@ -0,0 +1,286 @@
+# app/services/ocr_job_service.py
+"""
+批量 OCR 任务
+
+提交画廊 gid/token 与页码范围后在后台执行：并发解析图片地址并下载，下载完成的页面攒批后送入 OCR 工作进程，
+每页完成后通过 /ws/ocr-jobs 推送进度，已完成页面的结果可随时查询。
+"""
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from api.websocket import broadcast_json, ocr_job_connections
+from core.config import settings
+from core.logger import get_logger
+from services.ocr_service import OCRQueueFullError, download_image, ocr_worker_pool
+from starlette.concurrency import run_in_threadpool
+from utils.dialog_merger import merge_dialogs_in_reading_order
+from utils.exhentai_utils import AsyncExHentaiUtils
+
+logger = get_logger(__name__)
+
+# 工作进程全忙时批次的重试间隔（秒）
+QUEUE_RETRY_DELAY = 1.0
+
+FINISHED_STATUSES = ("completed", "cancelled", "failed")
+
+
+class OCRJob:
+    """单个批量 OCR 任务的状态与已完成页面的结果"""
+
+    def __init__(self, gid: str, token: str, pages: List[int], params: Dict, confidence_threshold: float):
+        self.job_id = uuid.uuid4().hex
+        self.gid = gid
+        self.token = token
+        self.params = params
+        self.confidence_threshold = confidence_threshold
+        self.status = "queued"
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.pages = {page: {"status": "pending"} for page in pages}
+        self.task = None
+
+    def count(self, status: str) -> int:
+        return sum(1 for page in self.pages.values() if page["status"] == status)
+
+    def summary(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "gid": self.gid,
+            "token": self.token,
+            "status": self.status,
+            "error": self.error,
+            "total": len(self.pages),
+            "completed": self.count("done"),
+            "failed": self.count("error"),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    def detail(self) -> dict:
+        return {
+            **self.summary(),
+            "pages": [
+                {"page": page, "status": info["status"], "error": info.get("error")} for page, info in self.pages.items()
+            ],
+        }
+
+
+class OCRJobManager:
+    """批量 OCR 任务管理，只保留最近 history 个任务"""
+
+    def __init__(self, download_concurrency: int, batch_size: int, history: int):
+        self.download_concurrency = max(1, download_concurrency)
+        self.batch_size = max(1, batch_size)
+        self.history = max(1, history)
+        self.jobs: "OrderedDict[str, OCRJob]" = OrderedDict()
+
+    async def submit(
+        self, gid: str, token: str, start_page: int, end_page: Optional[int], params: Dict, confidence_threshold: float
+    ) -> OCRJob:
+        """
+        提交任务，end_page 为空或超出画廊页数时识别到最后一页
+
+        异常:
+            ValueError: 页码范围无效或无法获取画廊页数
+        """
+        if start_page < 1:
+            raise ValueError("起始页码必须大于等于1")
+        if end_page is not None and end_page < start_page:
+            raise ValueError("结束页码不能小于起始页码")
+
+        # 同时校验起始页存在，并取得画廊页数作为结束页码的上限
+        info = await self._utils().fetch_full_image(gid, token, start_page)
+        if info.get("error"):
+            raise ValueError(f"无法获取画廊页数: {info['error']}")
+        total_pages = info["totalPages"]
+        if not total_pages:
+            raise ValueError("无法获取画廊页数")
+        end_page = total_pages if end_page is None else min(end_page, total_pages)
+
+        pages = list(range(start_page, end_page + 1))
+        job = OCRJob(gid, token, pages, params, confidence_threshold)
+        self.jobs[job.job_id] = job
+        self._trim()
+        job.task = asyncio.create_task(self._run(job))
+        logger.info(f"批量OCR任务已提交: {job.job_id}，画廊 {gid}，共 {len(pages)} 页")
+        return job
+
+    @staticmethod
+    def _utils() -> AsyncExHentaiUtils:
+        cookies = {
+            "ipb_member_id": settings.EXHENTAI_COOKIE_MEMBER_ID,
+            "ipb_pass_hash": settings.EXHENTAI_COOKIE_PASS_HASH,
+            "igneous": settings.EXHENTAI_COOKIE_IGNEOUS,
+        }
+        return AsyncExHentaiUtils(cookies)
+
+    def get(self, job_id: str) -> Optional[OCRJob]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[OCRJob]:
+        job = self.jobs.get(job_id)
+        if job is not None and job.task is not None and not job.task.done():
+            job.task.cancel()
+        return job
+
+    def cancel_all(self):
+        for job in self.jobs.values():
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+
+    def _trim(self):
+        """超出保留数量时丢弃最早的已结束任务"""
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.status in FINISHED_STATUSES]:
+            if len(self.jobs) <= self.history:
+                break
+            del self.jobs[job_id]
+
+    async def _emit(self, job: OCRJob, event: str, **extra):
+        await broadcast_json(
+            ocr_job_connections,
+            {
+                "type": "ocr_job",
+                "event": event,
+                "job_id": job.job_id,
+                "status": job.status,
+                "total": len(job.pages),
+                "completed": job.count("done"),
+                "failed": job.count("error"),
+                **extra,
+            },
+        )
+
+    async def _page_failed(self, job: OCRJob, page: int, error: Exception):
+        job.pages[page] = {"status": "error", "error": str(error)}
+        logger.warning(f"批量OCR任务 {job.job_id} 第 {page} 页失败: {error}")
+        await self._emit(job, "page_failed", page=page, error=str(error))
+
+    async def _run(self, job: OCRJob):
+        job.status = "running"
+        await self._emit(job, "started")
+        utils = self._utils()
+        download_slots = asyncio.Semaphore(self.download_concurrency)
+        batch_slots = asyncio.Semaphore(ocr_worker_pool.workers)
+        # 已下载到内存待识别的页面，容量限制下载进度不会远超识别进度，也限制了内存占用
+        ready = asyncio.Queue(maxsize=self.batch_size * 2)
+
+        # 子任务意外失败时取消整个任务（子任务内部已处理单页错误，这里只会是程序错误）
+        runner = asyncio.current_task()
+        children = []
+        child_errors = []
+
+        def child_done(task: asyncio.Task):
+            if not task.cancelled() and task.exception() is not None and not child_errors:
+                child_errors.append(task.exception())
+                runner.cancel()
+
+        def spawn(coro):
+            task = asyncio.create_task(coro)
+            task.add_done_callback(child_done)
+            children.append(task)
+
+        try:
+            try:
+                for page in job.pages:
+                    spawn(self._download_page(job, utils, page, download_slots, ready))
+
+                remaining = len(job.pages)
+                while remaining:
+                    batch = [await ready.get()]
+                    while len(batch) < self.batch_size and not ready.empty():
+                        batch.append(ready.get_nowait())
+                    remaining -= len(batch)
+
+                    items = [item for item in batch if item is not None]
+                    if items:
+                        await batch_slots.acquire()
+                        spawn(self._recognize_batch(job, items, batch_slots))
+
+                await asyncio.gather(*children)
+            finally:
+                # 取消或失败时停止尚未完成的下载与识别，并等待其退出
+                for task in children:
+                    task.cancel()
+                await asyncio.gather(*children, return_exceptions=True)
+
+            job.status = "completed"
+            logger.info(f"批量OCR任务完成: {job.job_id}，成功 {job.count('done')} 页，失败 {job.count('error')} 页")
+        except asyncio.CancelledError:
+            if child_errors:
+                self._fail(job, child_errors[0])
+            else:
+                job.status = "cancelled"
+                logger.info(f"批量OCR任务已取消: {job.job_id}")
+        except Exception as e:
+            self._fail(job, e)
+        finally:
+            job.finished_at = time.time()
+            await self._emit(job, "finished")
+
+    @staticmethod
+    def _fail(job: OCRJob, error: BaseException):
+        job.status = "failed"
+        job.error = str(error)
+        logger.error(f"批量OCR任务失败 {job.job_id}: {error}")
+
+    async def _download_page(self, job: OCRJob, utils, page: int, slots: asyncio.Semaphore, ready: asyncio.Queue):
+        """解析并下载单页图片，放入待识别队列；失败时放入 None 占位"""
+        async with slots:
+            try:
+                info = await utils.fetch_full_image(job.gid, job.token, page)
+                if info.get("error"):
+                    raise RuntimeError(info["error"])
+
+                image_source = await run_in_threadpool(download_image, info["imageUrl"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                await self._page_failed(job, page, e)
+                await ready.put(None)
+                return
+
+            job.pages[page] = {"status": "downloaded"}
+            await ready.put((page, image_source))
+
+    async def _recognize_batch(self, job: OCRJob, items: list, slots: asyncio.Semaphore):
+        """识别一批已下载的页面并逐页发布结果"""
+        pages = [page for page, _ in items]
+        try:
+            for page in pages:
+                job.pages[page] = {"status": "recognizing"}
+            start_time = time.time()
+            while True:
+                try:
+                    batch_results = await ocr_worker_pool.recognize_batch(
+                        [image_source for _, image_source in items], job.params, job.confidence_threshold
+                    )
+                    break
+                except OCRQueueFullError:
+                    # 交互式识别优先，批量任务等待空闲名额
+                    await asyncio.sleep(QUEUE_RETRY_DELAY)
+
+            merged = await run_in_threadpool(lambda: [merge_dialogs_in_reading_order(raw) for raw in batch_results])
+            processing_time = (time.time() - start_time) / len(items)
+            for page, results in zip(pages, merged):
+                job.pages[page] = {"status": "done", "results": results, "processing_time": processing_time}
+                await self._emit(job, "page_completed", page=page, result_count=len(results))
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            for page in pages:
+                await self._page_failed(job, page, e)
+        finally:
+            slots.release()
+
+
+ocr_job_manager = OCRJobManager(
+    download_concurrency=settings.OCR_JOB_DOWNLOAD_CONCURRENCY,
+    batch_size=settings.OCR_JOB_BATCH_SIZE,
+    history=settings.OCR_JOB_HISTORY,
+)
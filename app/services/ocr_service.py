@@ -0,0 +1,654 @@
+# app/services/ocr_service.py
+"""
+OCR 推理服务
+
+PaddleOCR 推理是 CPU 密集的同步调用，单次耗时可达数秒。推理在独立的进程池中执行，
+每个工作进程维护一个有数量与内存上限的 OCR 引擎池，按最近使用淘汰；事件循环只负责等待结果。
+工作进程启动时可预加载配置的引擎并执行一次识别预热，首个请求不必等待模型加载。
+识别结果按图片内容与引擎参数持久化缓存，重复识别同一张图片时不再提交到进程池。
+"""
+
+import asyncio
+import gc
+import importlib.util
+import io
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import requests
+from core.config import settings
+from core.logger import get_logger
+from fastapi import HTTPException
+from PIL import Image, ImageDraw
+from starlette.concurrency import run_in_threadpool
+from utils.http_client import exhentai_http_client
+from utils.image_cache import image_cache, is_cacheable_image_url
+from utils.ocr_result_cache import ocr_result_cache
+
+logger = get_logger(__name__)
+
+# 只检查是否已安装，PaddleOCR 只在工作进程中导入，API 进程不加载模型
+paddleocr_available = settings.PADDLE_OCR_ENABLED and importlib.util.find_spec("paddleocr") is not None
+
+
+class OCRQueueFullError(Exception):
+    """OCR 等待队列已满"""
+
+
+class OCRUnavailableError(Exception):
+    """OCR 工作进程不可用"""
+
+
+def engine_cache_key(params: Dict) -> str:
+    """OCR 参数组合对应的key（识别结果随全部参数变化）"""
+    return (
+        f"{params['language']}_{params['det_limit_type']}_{params['det_limit_side_len']}"
+        f"_{params['use_doc_orientation_classify']}_{params['use_doc_unwarping']}"
+    )
+
+
+def parse_engine_profiles(value: str) -> List[Dict]:
+    """
+    解析预加载的引擎配置，逗号分隔，每项格式为 语言[:检测尺寸限制类型[:检测尺寸限制边长]]，
+    例如 "japan,ch:max:1280"
+    """
+    profiles = []
+    for item in value.split(","):
+        parts = [part.strip() for part in item.split(":")]
+        if not parts[0]:
+            continue
+        try:
+            profiles.append(
+                {
+                    "language": parts[0],
+                    "det_limit_type": parts[1] if len(parts) > 1 and parts[1] else "max",
+                    "det_limit_side_len": int(parts[2]) if len(parts) > 2 and parts[2] else 960,
+                    "use_doc_orientation_classify": False,
+                    "use_doc_unwarping": False,
+                }
+            )
+        except ValueError:
+            logger.warning(f"忽略无效的OCR预加载配置: {item}")
+    return profiles
+
+
+# ---------------------------------------------------------------------------
+# 图片下载（在 API 进程的线程池中执行）
+# ---------------------------------------------------------------------------
+
+
+def download_image(image_url: str) -> Union[bytes, str]:
+    """
+    下载图片到内存，返回图片字节；本地文件路径原样返回，由工作进程直接读取
+    """
+    try:
+        # 如果是本地文件路径
+        if os.path.exists(image_url):
+            return image_url
+
+        # 检查是否是本地API的循环调用
+        if "localhost" in image_url or "127.0.0.1" in image_url:
+            # 如果是代理URL，提取原始URL
+            if "proxy-image?url=" in image_url:
+                from urllib.parse import parse_qs, unquote, urlparse
+
+                parsed = urlparse(image_url)
+                query_params = parse_qs(parsed.query)
+                if "url" in query_params:
+                    original_url = unquote(query_params["url"][0])
+                    logger.debug(f"检测到代理URL，提取原始URL: {original_url}")
+                    image_url = original_url
+                else:
+                    raise HTTPException(status_code=400, detail="无法从代理URL中提取原始图片URL")
+            else:
+                raise HTTPException(status_code=400, detail="不能从本地API下载图片，请提供外部图片URL")
+
+        # 阅读器已通过代理加载过的图片直接从磁盘缓存读取
+        use_cache = settings.EX_IMAGE_CACHE_ENABLED and is_cacheable_image_url(image_url)
+        if use_cache:
+            entry = image_cache.get(image_url)
+            if entry is not None:
+                with open(entry["path"], "rb") as f:
+                    data = f.read()
+                logger.debug(f"图片命中磁盘缓存: {image_url}")
+                return data
+
+        # 下载网络图片
+        logger.debug(f"正在下载图片: {image_url}")
+
+        # 添加必要的请求头
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+            "Referer": "https://exhentai.org/",
+        }
+
+        # 如果是ExHentai图片，添加认证cookies
+        cookies = None
+        if "exhentai.org" in image_url or "ehgt.org" in image_url:
+            if all(
+                [
+                    getattr(settings, "EXHENTAI_COOKIE_MEMBER_ID", None),
+                    getattr(settings, "EXHENTAI_COOKIE_PASS_HASH", None),
+                    getattr(settings, "EXHENTAI_COOKIE_IGNEOUS", None),
+                ]
+            ):
+                cookies = {
+                    "ipb_member_id": settings.EXHENTAI_COOKIE_MEMBER_ID,
+                    "ipb_pass_hash": settings.EXHENTAI_COOKIE_PASS_HASH,
+                    "igneous": settings.EXHENTAI_COOKIE_IGNEOUS,
+                }
+
+        # 使用应用级共享连接池，流式读取结束后连接归还连接池
+        with exhentai_http_client.get(image_url, headers=headers, cookies=cookies, stream=True) as response:
+            response.raise_for_status()
+
+            # 读入内存，同时写入磁盘缓存（写入失败不影响本次识别）
+            writer = image_cache.open_writer(image_url) if use_cache else None
+            buffer = bytearray()
+            for chunk in response.iter_content(chunk_size=65536):
+                buffer.extend(chunk)
+                if writer is not None:
+                    writer.write(chunk)
+            if writer is not None:
+                writer.commit(response.headers.get("content-type", "image/jpeg"), response.headers.get("last-modified"))
+
+        logger.debug(f"图片下载完成: {image_url}，{len(buffer)} 字节")
+        return bytes(buffer)
+
+    except requests.exceptions.RequestException as e:
+        logger.error(f"图片下载失败: {e}")
+        raise HTTPException(status_code=400, detail=f"图片下载失败: {str(e)}")
+    except Exception as e:
+        logger.error(f"图片处理错误: {e}")
+        raise HTTPException(status_code=500, detail=f"图片处理错误: {str(e)}")
+
+
+# ---------------------------------------------------------------------------
+# 以下函数在工作进程中执行
+# ---------------------------------------------------------------------------
+
+def _process_rss_mb() -> Optional[float]:
+    """当前进程的常驻内存（MB），psutil 不可用时返回 None"""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / 1024 / 1024
+
+
+class OCREnginePool:
+    """
+    工作进程内的 OCR 引擎池。
+
+    - 引擎只按需要加载不同模型的参数区分（语言、是否加载文档方向分类/文档矫正模型），
+      检测尺寸限制在每次识别时传入，不同尺寸参数共用同一套已加载的检测与识别模型
+    - 已加载文档预处理模型的引擎也可服务不需要这些模型的同语言请求（识别时关闭对应步骤）
+    - 引擎数超过 max_engines，或加载后进程内存超过 memory_budget_mb（0 表示不限制）时，
+      按最近使用淘汰其他引擎
+    - 释放的内存通常不会归还给操作系统，淘汰后 RSS 不会随之下降，因此进程内存按
+      空池时的 RSS + 各引擎加载时的 RSS 增量估算，而不是淘汰后重新读取 RSS
+    """
+
+    def __init__(self, max_engines: int, memory_budget_mb: int):
+        self.max_engines = max(1, max_engines)
+        self.memory_budget_mb = max(0, memory_budget_mb)
+        self._engines = OrderedDict()
+        # 各模型加载时的 RSS 增量（MB），淘汰后保留，复用已释放内存的重新加载不会低估
+        self._engine_mb = {}
+        self._base_rss_mb = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def model_key(params: Dict) -> Tuple[str, bool, bool]:
+        return (params["language"], bool(params["use_doc_orientation_classify"]), bool(params["use_doc_unwarping"]))
+
+    def _find(self, params: Dict):
+        """查找可以服务该参数的已加载引擎：优先完全匹配，其次是额外加载了文档预处理模型的同语言引擎"""
+        language, orientation, unwarping = self.model_key(params)
+        if (language, orientation, unwarping) in self._engines:
+            return (language, orientation, unwarping)
+        for key in reversed(self._engines):
+            if key[0] == language and key[1] >= orientation and key[2] >= unwarping:
+                return key
+        return None
+
+    def get(self, params: Dict):
+        key = self._find(params)
+        if key is not None:
+            self.hits += 1
+            self._engines.move_to_end(key)
+            return self._engines[key]
+
+        self.misses += 1
+        # 先腾出位置再加载，避免内存峰值时同时持有超出上限的引擎
+        while len(self._engines) >= self.max_engines:
+            self._evict()
+
+        from paddleocr import PaddleOCR
+
+        key = self.model_key(params)
+        language, orientation, unwarping = key
+        logger.info(f"初始化OCR引擎，语言: {language}, 文档方向分类: {orientation}, 文档矫正: {unwarping}")
+        rss_before = _process_rss_mb()
+        engine = PaddleOCR(lang=language, use_doc_orientation_classify=orientation, use_doc_unwarping=unwarping)
+        rss_after = _process_rss_mb()
+        if rss_before is not None and rss_after is not None:
+            if not self._engines:
+                self._base_rss_mb = rss_before
+            self._engine_mb[key] = max(self._engine_mb.get(key, 0.0), rss_after - rss_before)
+        self._engines[key] = engine
+
+        if self.memory_budget_mb and self._base_rss_mb is not None:
+            while self._estimated_mb() > self.memory_budget_mb and len(self._engines) > 1:
+                self._evict()
+        logger.info(f"OCR引擎初始化完成: {key}，当前引擎数 {len(self._engines)}")
+        return engine
+
+    def _estimated_mb(self) -> float:
+        """估算的进程内存：空池时的 RSS + 已加载引擎的 RSS 增量"""
+        return self._base_rss_mb + sum(self._engine_mb.get(key, 0.0) for key in self._engines)
+
+    def _evict(self):
+        key, _ = self._engines.popitem(last=False)
+        self.evictions += 1
+        # 释放模型占用的内存
+        gc.collect()
+        logger.info(f"OCR引擎已淘汰: {key}")
+
+    def stats(self) -> dict:
+        rss = _process_rss_mb()
+        return {
+            "pid": os.getpid(),
+            "engines": ["_".join(str(part) for part in key) for key in self._engines],
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "rss_mb": round(rss, 1) if rss is not None else None,
+            "engine_mb": {"_".join(str(part) for part in key): round(self._engine_mb.get(key, 0.0), 1) for key in self._engines},
+            "estimated_mb": round(self._estimated_mb(), 1) if self._base_rss_mb is not None else None,
+        }
+
+
+# 工作进程内的 OCR 引擎池
+_engine_pool = OCREnginePool(settings.OCR_ENGINE_POOL_SIZE, settings.OCR_ENGINE_MEMORY_MB)
+
+
+def _run_engine(images, params: Dict):
+    """使用引擎池中的引擎识别，检测尺寸限制与文档预处理开关按本次参数传入"""
+    return _engine_pool.get(params).ocr(
+        images,
+        text_det_limit_type=params["det_limit_type"],
+        text_det_limit_side_len=params["det_limit_side_len"],
+        use_doc_orientation_classify=params["use_doc_orientation_classify"],
+        use_doc_unwarping=params["use_doc_unwarping"],
+    )
+
+
+def _polys_to_bboxes(rec_polys) -> np.ndarray:
+    """将文本区域多边形批量转换为 [x1, y1, x2, y2] 数组"""
+    try:
+        polys = np.asarray(rec_polys, dtype=np.float64)
+    except ValueError:
+        polys = None
+    if polys is not None and polys.ndim == 3:
+        return np.concatenate([polys.min(axis=1), polys.max(axis=1)], axis=1)
+
+    # 各多边形顶点数不同时逐个计算
+    bboxes = np.empty((len(rec_polys), 4), dtype=np.float64)
+    for i, poly in enumerate(rec_polys):
+        points = np.asarray(poly, dtype=np.float64).reshape(-1, 2)
+        bboxes[i, :2] = points.min(axis=0)
+        bboxes[i, 2:] = points.max(axis=0)
+    return bboxes
+
+
+def _extract_results(result_dict, confidence_threshold: float) -> List[Dict]:
+    """
+    处理单张图片的OCR结果（新版PaddleOCR数据格式），返回过滤后的文本区域
+    [{"text", "confidence", "bbox": [x1, y1, x2, y2]}]
+
+    坐标转换与过滤在数组上批量完成，只为保留下来的文本区域创建 Python 对象
+    """
+    # 获取识别文本、置信度和坐标
+    rec_texts = result_dict.get("rec_texts", [])
+    rec_scores = result_dict.get("rec_scores", [])
+    rec_polys = result_dict.get("rec_polys", [])
+
+    count = min(len(rec_texts), len(rec_scores), len(rec_polys))
+    if count == 0:
+        return []
+
+    texts = np.asarray(rec_texts[:count], dtype=str)
+    scores = np.asarray(rec_scores[:count], dtype=np.float64)
+    bboxes = _polys_to_bboxes(rec_polys[:count])
+
+    # 过滤空文本和低置信度结果
+    keep = np.flatnonzero((np.char.str_len(np.char.strip(texts)) > 0) & (scores >= confidence_threshold))
+
+    return [
+        {"text": text, "confidence": confidence, "bbox": bbox}
+        for text, confidence, bbox in zip(texts[keep].tolist(), scores[keep].tolist(), bboxes[keep].tolist())
+    ]
+
+
+def _decode_image(image_source: Union[bytes, str]):
+    """
+    将图片字节或本地文件一次解码为 OCR 引擎可直接使用的 BGR 数组，
+    带透明通道的图片合成到白色背景上
+    """
+    with Image.open(io.BytesIO(image_source) if isinstance(image_source, bytes) else image_source) as img:
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        else:
+            img.load()
+        return np.ascontiguousarray(np.asarray(img)[:, :, ::-1])
+
+
+# 工作进程启动预热失败时的错误信息
+_warm_up_error: Optional[str] = None
+
+
+def _warm_up_image() -> np.ndarray:
+    """生成带少量文字的小图，使预热同时经过检测与识别模型"""
+    img = Image.new("RGB", (320, 96), (255, 255, 255))
+    ImageDraw.Draw(img).text((16, 36), "OCR warm up 0123", fill=(0, 0, 0))
+    return np.ascontiguousarray(np.asarray(img)[:, :, ::-1])
+
+
+def _init_worker(profiles: List[Dict]):
+    """
+    工作进程初始化：加载预设的引擎并执行一次识别。
+    初始化完成前该进程不会领取任务；失败只记录错误，不影响进程继续服务
+    """
+    global _warm_up_error
+    image = _warm_up_image()
+    for params in profiles:
+        start_time = time.time()
+        try:
+            _run_engine(image, params)
+            logger.info(f"OCR引擎预热完成: {engine_cache_key(params)}，耗时 {time.time() - start_time:.1f}s")
+        except Exception as e:
+            _warm_up_error = f"{engine_cache_key(params)}: {e}"
+            logger.error(f"OCR引擎预热失败 {engine_cache_key(params)}: {e}")
+
+
+def _worker_status() -> Tuple[Optional[str], dict]:
+    """返回预热错误与引擎池统计，用于确认工作进程已完成初始化"""
+    return _warm_up_error, _engine_pool.stats()
+
+
+def _recognize(image_source: Union[bytes, str], params: Dict, confidence_threshold: float) -> Tuple[List[Dict], dict]:
+    """执行单张图片的OCR识别，同时返回引擎池统计"""
+    ocr_results = _run_engine(_decode_image(image_source), params)
+    results = _extract_results(ocr_results[0], confidence_threshold) if ocr_results else []
+    return results, _engine_pool.stats()
+
+
+def _recognize_batch(
+    image_sources: List[Union[bytes, str]], params: Dict, confidence_threshold: float
+) -> Tuple[List[List[Dict]], dict]:
+    """一次调用识别多张图片，返回与 image_sources 一一对应的结果列表及引擎池统计"""
+    images = [_decode_image(image_source) for image_source in image_sources]
+    ocr_results = _run_engine(images, params) or []
+    results = [_extract_results(result_dict, confidence_threshold) for result_dict in ocr_results]
+    if len(results) != len(image_sources):
+        raise RuntimeError(f"批量识别结果数量不匹配: 期望 {len(image_sources)}，实际 {len(results)}")
+    return results, _engine_pool.stats()
+
+
+# ---------------------------------------------------------------------------
+# API 进程中的进程池管理
+# ---------------------------------------------------------------------------
+
+
+class OCRWorkerPool:
+    """
+    OCR 工作进程池。
+
+    - workers: 同时执行推理的进程数（每个进程各自加载模型，注意内存占用）
+    - max_queue: 所有工作进程都忙时允许排队等待的请求数，超出时拒绝新请求
+    - preload_profiles: 每个工作进程启动时预加载并预热的引擎参数
+    """
+
+    def __init__(self, workers: int, max_queue: int, preload_profiles: List[Dict] = None):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.preload_profiles = preload_profiles or []
+        if len(self.preload_profiles) > settings.OCR_ENGINE_POOL_SIZE:
+            logger.warning(
+                f"OCR预加载配置数 {len(self.preload_profiles)} 超过引擎池上限 {settings.OCR_ENGINE_POOL_SIZE}，只预加载前 {settings.OCR_ENGINE_POOL_SIZE} 个"
+            )
+            self.preload_profiles = self.preload_profiles[: settings.OCR_ENGINE_POOL_SIZE]
+        self.warm_up = {"status": "pending" if self.preload_profiles else "disabled", "duration": None, "errors": []}
+        self._warm_up_task = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        # 各工作进程最近一次上报的引擎池统计，按进程号记录
+        self.engine_stats: Dict[int, dict] = {}
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        """调用方需持有 self._lock"""
+        if self._executor is None:
+            # spawn 启动，避免 fork 出带有事件循环和线程状态的子进程
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.preload_profiles,),
+            )
+            logger.info(f"OCR 工作进程池已启动，进程数 {self.workers}，队列上限 {self.max_queue}")
+        return self._executor
+
+    def _reset_broken(self, executor: ProcessPoolExecutor):
+        """丢弃已损坏的进程池，下次提交时重建"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.engine_stats.clear()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def start(self):
+        with self._lock:
+            self._ensure_executor()
+
+    def start_warm_up(self):
+        """在后台预热所有工作进程，不阻塞服务启动"""
+        if self.preload_profiles and self._warm_up_task is None:
+            self._warm_up_task = asyncio.create_task(self._warm_up())
+
+    async def _warm_up(self):
+        self.warm_up["status"] = "warming"
+        start_time = time.time()
+        logger.info(f"开始预热OCR引擎: {', '.join(engine_cache_key(params) for params in self.preload_profiles)}")
+        ready_workers = {}
+        try:
+            # 工作进程完成初始化后才会领取任务，收到每个进程的回复即表示全部预热完成。
+            # 进程池只在没有空闲进程时才启动新进程，因此每轮同时提交与进程数相同的任务
+            while len(ready_workers) < self.workers:
+                submitted = []
+                try:
+                    for _ in range(self.workers):
+                        submitted.append(self._submit(_worker_status))
+                except OCRQueueFullError:
+                    pass
+
+                for future, executor in submitted:
+                    try:
+                        error, engine_stats = await asyncio.wrap_future(future)
+                    except BrokenProcessPool:
+                        self._reset_broken(executor)
+                        raise
+                    self.engine_stats[engine_stats["pid"]] = engine_stats
+                    ready_workers.setdefault(engine_stats["pid"], error)
+
+                if len(ready_workers) < self.workers:
+                    # 其他进程仍在初始化
+                    await asyncio.sleep(0.5)
+        except Exception as e:
+            self.warm_up.update(status="failed", errors=[str(e)])
+            logger.error(f"OCR引擎预热失败: {e}")
+            return
+
+        errors = [error for error in ready_workers.values() if error]
+        self.warm_up.update(status="failed" if errors else "ready", duration=round(time.time() - start_time, 2), errors=errors)
+        logger.info(f"OCR引擎预热结束，状态 {self.warm_up['status']}，耗时 {self.warm_up['duration']}s")
+
+    @property
+    def ready(self) -> bool:
+        """预热结束（或未配置预热）且 OCR 可用；预热失败的配置会在首次请求时重新加载"""
+        return paddleocr_available and self._executor is not None and self.warm_up["status"] in ("ready", "failed", "disabled")
+
+    def shutdown(self):
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+            self._warm_up_task = None
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self.engine_stats.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+            logger.info("OCR 工作进程池已关闭")
+
+    def _submit(self, func, *args):
+        with self._lock:
+            if self._pending >= self.capacity:
+                self.rejected += 1
+                raise OCRQueueFullError(f"OCR 队列已满（{self.capacity}）")
+            executor = self._ensure_executor()
+            try:
+                future = executor.submit(func, *args)
+            except BrokenProcessPool:
+                broken = True
+            else:
+                broken = False
+                self._pending += 1
+
+        if broken:
+            self._reset_broken(executor)
+            raise OCRUnavailableError("OCR 工作进程异常退出")
+
+        # 任务真正结束（而不是调用方放弃等待）时才释放队列名额
+        future.add_done_callback(self._on_done)
+        return future, executor
+
+    def _on_done(self, future):
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    async def recognize(self, image_source: Union[bytes, str], params: Dict, confidence_threshold: float) -> List[Dict]:
+        """
+        在工作进程中识别图片（图片字节或本地文件路径），命中结果缓存时直接返回
+
+        异常:
+            OCRQueueFullError: 队列已满
+            OCRUnavailableError: 工作进程异常退出（如内存不足被杀死），进程池会在下次提交时重建
+        """
+        return (await self._recognize_cached([image_source], params, confidence_threshold))[0]
+
+    async def recognize_batch(
+        self, image_sources: List[Union[bytes, str]], params: Dict, confidence_threshold: float
+    ) -> List[List[Dict]]:
+        """
+        在同一个工作进程中批量识别多张图片（占用一个队列名额），只有未命中结果缓存的图片送入识别，异常同 recognize
+        """
+        return await self._recognize_cached(image_sources, params, confidence_threshold)
+
+    async def _recognize_cached(
+        self, image_sources: List[Union[bytes, str]], params: Dict, confidence_threshold: float
+    ) -> List[List[Dict]]:
+        if not paddleocr_available:
+            raise OCRUnavailableError("OCR服务未启用或PaddleOCR未正确安装")
+
+        params_key = engine_cache_key(params)
+        image_hashes = [None] * len(image_sources)
+        results = [None] * len(image_sources)
+        if ocr_result_cache.enabled:
+            image_hashes = await run_in_threadpool(
+                lambda: [ocr_result_cache.hash_image(image_source) for image_source in image_sources]
+            )
+            results = await run_in_threadpool(
+                lambda: [ocr_result_cache.get(image_hash, params_key) for image_hash in image_hashes]
+            )
+
+        misses = [index for index, result in enumerate(results) if result is None]
+        if misses:
+            # 缓存未过滤的结果，置信度阈值在返回前再应用
+            if len(misses) == 1:
+                fresh = [await self._run(_recognize, image_sources[misses[0]], params, 0.0)]
+            else:
+                fresh = await self._run(_recognize_batch, [image_sources[index] for index in misses], params, 0.0)
+            for index, result in zip(misses, fresh):
+                results[index] = result
+
+            if ocr_result_cache.enabled:
+                await run_in_threadpool(
+                    lambda: [ocr_result_cache.set(image_hashes[index], params_key, results[index]) for index in misses]
+                )
+
+        return [
+            [item for item in result if item["confidence"] >= confidence_threshold] for result in results
+        ]
+
+    async def _run(self, func, image_input, params: Dict, confidence_threshold: float):
+        future, executor = self._submit(func, image_input, params, confidence_threshold)
+        try:
+            results, engine_stats = await asyncio.wrap_future(future)
+        except BrokenProcessPool as e:
+            self._reset_broken(executor)
+            raise OCRUnavailableError(f"OCR 工作进程异常退出: {e}")
+        self.engine_stats[engine_stats["pid"]] = engine_stats
+        return results
+
+    def engine_pool_stats(self) -> dict:
+        """汇总各工作进程的引擎池统计"""
+        workers = list(self.engine_stats.values())
+        return {
+            "max_engines_per_worker": settings.OCR_ENGINE_POOL_SIZE,
+            "memory_budget_mb": settings.OCR_ENGINE_MEMORY_MB,
+            "hits": sum(worker["hits"] for worker in workers),
+            "misses": sum(worker["misses"] for worker in workers),
+            "evictions": sum(worker["evictions"] for worker in workers),
+            "workers": workers,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "started": self._executor is not None,
+            "pending": self._pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+ocr_worker_pool = OCRWorkerPool(
+    settings.OCR_WORKERS, settings.OCR_MAX_QUEUE, parse_engine_profiles(settings.OCR_PRELOAD_PROFILES)
+)
@@ -5,10 +5,14 @@ import os
 import shutil
 import time
 
+from typing import List, Optional
+
 from core.config import settings
 from core.logger import get_logger
+from services import ex_gallery_service
 from services.ex_gallery_service import load_ex_gallery_data
 from utils.exhentai_utils import ExHentaiUtils
+from utils.http_client import exhentai_http_client
 from utils.websocket_logger import WebSocketLogHandler
 
 logger = get_logger(__name__)
@@ -47,11 +51,109 @@ def backup_json_file(target_file, backup_dir, keep_count=5, prefix="backup"):
         os.remove(os.path.join(backup_dir, old_file))
 
 
-def sync_ex_favorites():
+def _with_favorite_fields(metadata: dict, favorite: dict) -> dict:
+    """将收藏分类与收藏时间合并进元数据，供下次增量同步比对"""
+    return {**metadata, "favCategory": favorite["favCategory"], "favTime": favorite["favTime"]}
+
+
+def _full_favorites_metadata(client: ExHentaiUtils):
+    """全量同步：爬取全部收藏页，爬取的同时流水线获取所有本子的元数据"""
+    favorites = []
+
+    def record_pages():
+        for records, _ in client.iter_favorite_pages():
+            favorites.extend(records)
+            yield records
+
+    metadata = client.fetch_metadata_pipeline(
+        record_pages(), max_retries=settings.EX_SYNC_RETRIES, retry_delay=settings.EX_RETRY_DELAY
+    )
+
+    favorites_by_gid = {fav["gid"]: fav for fav in favorites}
+    data = []
+    for item in metadata:
+        favorite = favorites_by_gid.get(str(item.get("gid")))
+        data.append(_with_favorite_fields(item, favorite) if favorite else item)
+    return data, {"added": len(data), "updated": 0, "removed": 0}
+
+
+def _incremental_favorites_metadata(client: ExHentaiUtils, existing: List[dict], logger):
+    """
+    增量同步：逐页爬取收藏夹并与已加载的数据比对 (gid, token, favTime)。
+
+    - 只对新增或 token 变化的本子请求 gdata 接口，每页比对完成后立即进入元数据请求流水线
+    - 某一整页都未变化，且已爬取部分加上剩余旧数据恰好等于页面显示的收藏总数时提前停止爬取
+    - 完整爬取到最后一页时，未出现的旧数据视为已取消收藏并删除；
+      任一收藏页请求失败时 iter_favorite_pages 抛出 RuntimeError，不会计算删除也不会写入文件
+    """
+    known = {str(item.get("gid")): item for item in existing}
+    scraped = []
+    seen = set()
+    state = {"remaining": [], "stopped_early": False, "to_fetch": 0, "added": 0}
+
+    def changed_pages():
+        for records, total in client.iter_favorite_pages():
+            page_unchanged = bool(records)
+            to_fetch = []
+            for favorite in records:
+                if favorite["gid"] in seen:
+                    continue
+                seen.add(favorite["gid"])
+                scraped.append(favorite)
+
+                old = known.get(favorite["gid"])
+                if old is None or old.get("token") != favorite["token"]:
+                    to_fetch.append(favorite)
+                    state["added"] += old is None
+                if old is None or old.get("token") != favorite["token"] or old.get("favTime") != favorite["favTime"]:
+                    page_unchanged = False
+
+            state["to_fetch"] += len(to_fetch)
+            yield to_fetch
+
+            if page_unchanged and total is not None:
+                remaining = [item for item in existing if str(item.get("gid")) not in seen]
+                if len(scraped) + len(remaining) == total:
+                    state["remaining"] = remaining
+                    state["stopped_early"] = True
+                    logger.info(f"已到达未变化的部分，提前结束爬取（已爬取 {len(scraped)} 项）")
+                    return
+
+    metadata = client.fetch_metadata_pipeline(
+        changed_pages(), max_retries=settings.EX_SYNC_RETRIES, retry_delay=settings.EX_RETRY_DELAY
+    )
+    fetched = {str(item.get("gid")): item for item in metadata}
+    logger.info(f"共爬取 {len(scraped)} 项收藏，其中 {state['to_fetch']} 项获取了元数据")
+
+    data = []
+    for favorite in scraped:
+        base = fetched.get(favorite["gid"]) or known.get(favorite["gid"])
+        if base is None:
+            # gdata 未返回该本子（例如已被删除），跳过
+            continue
+        data.append(_with_favorite_fields(base, favorite))
+    data.extend(state["remaining"])
+
+    changes = {
+        "added": state["added"],
+        "updated": state["to_fetch"] - state["added"],
+        "removed": 0 if state["stopped_early"] else len(known.keys() - seen),
+    }
+    return data, changes
+
+
+def sync_ex_favorites(incremental: Optional[bool] = None):
+    """
+    执行收藏夹数据同步流程，并通过 WebSocket 实时发送日志
+
+    参数:
+        incremental: 是否增量同步，默认读取 EX_SYNC_INCREMENTAL 配置
+    """
     from main import main_event_loop
 
-    """执行收藏夹数据同步流程，并通过 WebSocket 实时发送日志"""
     logger = get_logger("sync_metadata")
+    if incremental is None:
+        incremental = settings.EX_SYNC_INCREMENTAL
 
     # 添加 WebSocket 日志 handler（使用无颜色的格式）
     ws_handler = WebSocketLogHandler(loop=main_event_loop)
@@ -68,18 +170,36 @@ def sync_ex_favorites():
             "igneous": settings.EXHENTAI_COOKIE_IGNEOUS,
         }
 
-        # 初始化工具类并抓取元数据
-        client = ExHentaiUtils(settings.EXHENTAI_BASE_URL, cookies, logger=logger)
+        # 确保已加载现有数据，作为增量比对的基准
+        load_ex_gallery_data()
+        existing = ex_gallery_service.ex_gallery_data
+        mode = "incremental" if incremental and existing else "full"
+        logger.info(f"同步模式: {mode}，现有数据 {len(existing)} 项")
+
+        # 初始化工具类并抓取元数据，收藏页与 gdata 接口请求都复用应用级共享连接池
+        client = ExHentaiUtils(
+            settings.EXHENTAI_BASE_URL,
+            cookies,
+            logger=logger,
+            session=exhentai_http_client.session,
+            timeout=exhentai_http_client.timeout,
+        )
         try:
-            data = client.get_favorites_metadata(
-                max_retries=settings.EX_SYNC_RETRIES,
-                retry_delay=settings.EX_RETRY_DELAY
-            )
+            with client:
+                if mode == "incremental":
+                    data, changes = _incremental_favorites_metadata(client, existing, logger)
+                else:
+                    data, changes = _full_favorites_metadata(client)
         except RuntimeError as e:
             # 处理数据获取失败（重试后仍失败）
             logger.error(f"数据获取失败，同步终止: {str(e)}")
             return {"status": "error", "message": str(e), "count": 0}
 
+        logger.info(f"新增 {changes['added']} 项，更新 {changes['updated']} 项，删除 {changes['removed']} 项")
+        if data == existing:
+            logger.info(f"收藏夹无变化，跳过写入，共 {len(data)} 项")
+            return {"status": "success", "count": len(data), "mode": mode, **changes}
+
         # 备份旧文件
         backup_json_file(
             settings.GALLERY_DATA_PATH,
@@ -96,7 +216,7 @@ def sync_ex_favorites():
         load_ex_gallery_data(force_reload=True)
 
         logger.info(f"同步完成，共 {len(data)} 项")
-        return {"status": "success", "count": len(data)}
+        return {"status": "success", "count": len(data), "mode": mode, **changes}
     
     except Exception as e:
         logger.error(f"同步过程中发生未预期错误: {str(e)}")
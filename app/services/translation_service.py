@@ -8,6 +8,7 @@ from typing import Optional
 from openai import OpenAI
 from core.config import settings
 from core.logger import get_logger
+from utils.translation_cache import prompt_version, translation_cache
 
 logger = get_logger(__name__)
 
@@ -121,16 +122,25 @@ class TranslationService:
         Returns:
             {"success": bool, "translation": str, "error": str}
         """
-        if not self.is_initialized:
-            if not self.initialize():
-                return {"success": False, "translation": "", "error": "翻译服务初始化失败"}
-
         if not japanese_text or not japanese_text.strip():
             return {"success": False, "translation": "", "error": "输入文本为空"}
 
         if target_language != "zh":
             return {"success": False, "translation": "", "error": f"暂不支持目标语言: {target_language}，目前只支持中文 (zh)"}
 
+        # 先查译文缓存，命中时无需初始化客户端或调用 API
+        cache_key = translation_cache.make_key(
+            japanese_text, self.model_name, prompt_version(self.translation_prompt), target_language
+        )
+        cached = translation_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"译文缓存命中，长度: {len(japanese_text)}")
+            return {"success": True, "translation": cached, "error": ""}
+
+        if not self.is_initialized:
+            if not self.initialize():
+                return {"success": False, "translation": "", "error": "翻译服务初始化失败"}
+
         try:
             logger.info(f"开始翻译日文文本，长度: {len(japanese_text)}")
 
@@ -150,6 +160,8 @@ class TranslationService:
                 translation = response.choices[0].message.content.strip()
 
                 logger.info(f"翻译完成，结果长度: {len(translation)}")
+                if translation:
+                    translation_cache.set(cache_key, japanese_text, translation)
 
                 return {"success": True, "translation": translation, "error": ""}
             else:
@@ -214,6 +226,7 @@ class TranslationService:
             "model_name": self.model_name,
             "base_url": self.base_url,
             "api_key_env": self.api_key_env,
+            "cache": translation_cache.stats(),
         }
 
 
@@ -0,0 +1,294 @@
+# app/utils/dialog_merger.py
+
+import math
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Rectangular:
+    """矩形类，用于碰撞检测"""
+
+    def __init__(self, x: float, y: float, w: float, h: float):
+        self.x0 = x
+        self.y0 = y
+        self.x1 = x + w
+        self.y1 = y + h
+        self.w = w
+        self.h = h
+
+    def collision(self, r2) -> bool:
+        """检测与另一个矩形是否碰撞"""
+        return self.x0 < r2.x1 and self.y0 < r2.y1 and self.x1 > r2.x0 and self.y1 > r2.y0
+
+    def distance_to(self, other) -> float:
+        """计算到另一个矩形的距离"""
+        center1_x = (self.x0 + self.x1) / 2
+        center1_y = (self.y0 + self.y1) / 2
+        center2_x = (other.x0 + other.x1) / 2
+        center2_y = (other.y0 + other.y1) / 2
+
+        return math.sqrt((center1_x - center2_x) ** 2 + (center1_y - center2_y) ** 2)
+
+    def expand(self, expand_ratio: float = 1.5):
+        """扩展矩形区域"""
+        expand_w = self.w * expand_ratio - self.w
+        expand_h = self.h * expand_ratio - self.h
+
+        return Rectangular(self.x0 - expand_w / 2, self.y0 - expand_h / 2, self.w + expand_w, self.h + expand_h)
+
+
+class SpatialGrid:
+    """
+    均匀网格空间索引：矩形登记到其覆盖的所有网格中，
+    查询时只返回与查询区域重叠的网格中的条目（可能包含不相交的条目，调用方需再精确判断）
+    """
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self._cells = defaultdict(list)
+        self._bounds = None
+
+    def _cell_span(self, x0: float, y0: float, x1: float, y1: float) -> Tuple[int, int, int, int]:
+        size = self.cell_size
+        return math.floor(x0 / size), math.floor(y0 / size), math.floor(x1 / size), math.floor(y1 / size)
+
+    def insert(self, item, rect: Rectangular):
+        cx0, cy0, cx1, cy1 = self._cell_span(rect.x0, rect.y0, rect.x1, rect.y1)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                self._cells[(cx, cy)].append(item)
+
+        if self._bounds is None:
+            self._bounds = [cx0, cy0, cx1, cy1]
+        else:
+            bounds = self._bounds
+            bounds[0], bounds[1] = min(bounds[0], cx0), min(bounds[1], cy0)
+            bounds[2], bounds[3] = max(bounds[2], cx1), max(bounds[3], cy1)
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> set:
+        if self._bounds is None:
+            return set()
+        # 查询范围限制在已登记的网格范围内，超大的查询区域不会遍历大量空网格
+        cx0, cy0, cx1, cy1 = self._cell_span(x0, y0, x1, y1)
+        bx0, by0, bx1, by1 = self._bounds
+        found = set()
+        for cx in range(max(cx0, bx0), min(cx1, bx1) + 1):
+            for cy in range(max(cy0, by0), min(cy1, by1) + 1):
+                bucket = self._cells.get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        return found
+
+
+class DialogMerger:
+    """
+    对话框合并器
+
+    按面积从大到小依次以未分组的文本框为起点，沿"相邻"关系（扩展后重叠或中心距离不超过 max_distance）
+    迭代深度优先收集尚未分组的文本框。相邻关系是有方向的（扩展量取决于起点文本框的大小），
+    因此分组依赖处理顺序，不能简化为无向连通分量。候选文本框通过均匀网格索引查找，无需扫描全部文本框。
+    """
+
+    def __init__(self, expand_ratio: float = 1.2, max_distance: float = 30.0, min_group_size: int = 2):
+        self.expand_ratio = expand_ratio
+        self.max_distance = max_distance
+        self.min_group_size = min_group_size
+
+    @staticmethod
+    def bbox_to_rect(bbox: List[float]) -> Rectangular:
+        """将bbox [x1, y1, x2, y2] 转换为矩形对象"""
+        x1, y1, x2, y2 = bbox
+        return Rectangular(x1, y1, x2 - x1, y2 - y1)
+
+    def _cell_size(self, rectangles: List[Tuple[Rectangular, int]]) -> float:
+        """网格边长取文本框长边的中位数，且不小于 max_distance"""
+        sides = sorted(max(rect.w, rect.h) for rect, _ in rectangles)
+        return max(sides[len(sides) // 2], self.max_distance, 1.0)
+
+    def _find_nearby_texts(
+        self, position: int, rectangles: List[Tuple[Rectangular, int]], grid: SpatialGrid, used: List[bool]
+    ) -> List[int]:
+        """查找附近尚未分组的文本框，返回其在 rectangles 中的位置（按面积从大到小）"""
+        rect = rectangles[position][0]
+        expanded_rect = rect.expand(expand_ratio=self.expand_ratio)
+
+        # 查询区域覆盖扩展后的矩形，以及中心距离 max_distance 以内的范围
+        center_x = (rect.x0 + rect.x1) / 2
+        center_y = (rect.y0 + rect.y1) / 2
+        candidates = grid.query(
+            min(expanded_rect.x0, center_x - self.max_distance),
+            min(expanded_rect.y0, center_y - self.max_distance),
+            max(expanded_rect.x1, center_x + self.max_distance),
+            max(expanded_rect.y1, center_y + self.max_distance),
+        )
+
+        nearby_positions = []
+        for other in candidates:
+            if used[other]:
+                continue
+
+            other_rect = rectangles[other][0]
+            # 优先考虑重叠
+            if expanded_rect.collision(other_rect) or rect.distance_to(other_rect) <= self.max_distance:
+                nearby_positions.append(other)
+
+        nearby_positions.sort()
+        return nearby_positions
+
+    def _find_connected_texts(
+        self,
+        start: int,
+        rectangles: List[Tuple[Rectangular, int]],
+        grid: SpatialGrid,
+        used: List[bool],
+        current_group: List[int],
+    ):
+        """迭代深度优先查找相邻的文本框，避免文本框很多时超出递归深度"""
+        stack = [iter(self._find_nearby_texts(start, rectangles, grid, used))]
+        while stack:
+            for position in stack[-1]:
+                if not used[position]:
+                    used[position] = True
+                    current_group.append(rectangles[position][1])
+                    # 先查找与新加入文本框相邻的文本框，再继续处理当前文本框的其余邻居
+                    stack.append(iter(self._find_nearby_texts(position, rectangles, grid, used)))
+                    break
+            else:
+                stack.pop()
+
+    def group_texts(self, ocr_results: List[Dict]) -> List[List[int]]:
+        """
+        将文本框分组，返回每组文本框在 ocr_results 中的下标
+        """
+        if not ocr_results:
+            return []
+
+        # 按面积排序，从大到小处理（稳定排序，面积相同时保持原顺序）
+        bboxes = np.array([result["bbox"] for result in ocr_results], dtype=np.float64)
+        areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+        order = np.argsort(-areas, kind="stable").tolist()
+
+        # 转换为矩形对象
+        rectangles = [(self.bbox_to_rect(ocr_results[i]["bbox"]), i) for i in order]
+
+        # 建立空间索引，登记的是文本框在 rectangles 中的位置
+        grid = SpatialGrid(self._cell_size(rectangles))
+        for position, (rect, _) in enumerate(rectangles):
+            grid.insert(position, rect)
+
+        # 合并逻辑
+        merged_groups = []
+        used = [False] * len(rectangles)
+
+        for position, (rect, original_index) in enumerate(rectangles):
+            if used[position]:
+                continue
+
+            # 创建新的群组
+            current_group = [original_index]
+            used[position] = True
+
+            # 查找相邻的文本框
+            self._find_connected_texts(position, rectangles, grid, used, current_group)
+
+            # 保留所有群组
+            merged_groups.append(current_group)
+
+        return merged_groups
+
+    def merge_ocr_results(self, ocr_results: List[Dict]) -> List[Dict]:
+        """
+        合并OCR识别结果中的对话框
+
+        Args:
+            ocr_results: OCR结果列表，每个元素包含text, confidence, bbox
+
+        Returns:
+            合并后的结果列表
+        """
+        if not ocr_results:
+            return []
+
+        logger.info(f"开始合并对话框，原始文本区域数量: {len(ocr_results)}")
+
+        merged_groups = self.group_texts(ocr_results)
+
+        # 创建合并后的结果
+        merged_results = []
+
+        for group_indices in merged_groups:
+            if len(group_indices) >= self.min_group_size:
+                # 对话框合并：按从右到左排序文字
+                group_data = []
+                for idx in group_indices:
+                    result = ocr_results[idx]
+                    bbox = result["bbox"]
+                    center_x = (bbox[0] + bbox[2]) / 2
+                    group_data.append((idx, center_x, result))
+
+                # 按x坐标从右到左排序（x值大的在前）
+                group_data.sort(key=lambda x: x[1], reverse=True)
+
+                # 合并文字（用空格连接）
+                merged_text = " ".join([item[2]["text"] for item in group_data])
+                merged_confidence = sum([item[2]["confidence"] for item in group_data]) / len(group_data)
+
+                # 计算合并后的边界框
+                all_x = [item[2]["bbox"][0] for item in group_data] + [item[2]["bbox"][2] for item in group_data]
+                all_y = [item[2]["bbox"][1] for item in group_data] + [item[2]["bbox"][3] for item in group_data]
+
+                merged_bbox = [min(all_x), min(all_y), max(all_x), max(all_y)]
+
+                merged_results.append(
+                    {
+                        "text": merged_text,
+                        "confidence": merged_confidence,
+                        "bbox": merged_bbox,
+                        "is_merged": True,
+                        "original_count": len(group_indices),
+                        "original_texts": [item[2]["text"] for item in group_data],
+                    }
+                )
+            else:
+                # 单独的文本框
+                for idx in group_indices:
+                    result = ocr_results[idx]
+                    merged_results.append(
+                        {
+                            "text": result["text"],
+                            "confidence": result["confidence"],
+                            "bbox": result["bbox"],
+                            "is_merged": False,
+                            "original_count": 1,
+                            "original_texts": [result["text"]],
+                        }
+                    )
+
+        # 按置信度排序
+        merged_results.sort(key=lambda x: x["confidence"], reverse=True)
+
+        logger.info(f"对话框合并完成，生成 {len(merged_results)} 个文本区域")
+
+        return merged_results
+
+
+def merge_dialogs_in_reading_order(raw_results: List[Dict]) -> List[Dict]:
+    """合并对话框并按漫画阅读顺序排序"""
+    # 使用对话框合并器处理结果
+    dialog_merger = DialogMerger()
+    merged_results = dialog_merger.merge_ocr_results(raw_results)
+
+    if not merged_results:
+        return []
+
+    # 按漫画阅读顺序排序（右到左，上到下）
+    # 使用右上角坐标作为排序基准，排序键：(y坐标, -x坐标)
+    # y坐标越小越靠前（从上到下），x坐标越大越靠前（从右到左）
+    bboxes = np.array([result["bbox"] for result in merged_results], dtype=np.float64)  # [x1, y1, x2, y2]
+    order = np.lexsort((-bboxes[:, 2], bboxes[:, 1]))
+    return [merged_results[i] for i in order.tolist()]
@@ -1,163 +1,717 @@
 # app/utils/exhentai_utils.py
 
+import asyncio
 import json
 import os
+import random
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
+
+try:
+    from lxml import etree as lxml_etree
+    from lxml import html as lxml_html
+
+    # ExHentai 页面均为 UTF-8；不指定时 libxml2 会把无编码声明的字节按 Latin-1 解码
+    _LXML_UTF8_PARSER = lxml_html.HTMLParser(encoding="utf-8")
+except ImportError:
+    lxml_etree = lxml_html = None
+from core.config import settings
 from core.logger import get_logger
+from requests.adapters import HTTPAdapter
+from utils.http_client import build_cookie_header, exhentai_async_client
+from utils.rate_limiter import TokenBucket
+from utils.single_flight import AsyncSingleFlight, SingleFlight
+from utils.ttl_cache import TTLCache
+
+GDATA_API_URL = "https://api.e-hentai.org/api.php"
+GDATA_BATCH_SIZE = 25
+# 重试退避的最大等待时间（秒）
+MAX_BACKOFF_DELAY = 60.0
+
+# gdata 接口的限流按 IP 计算，所有实例共享同一个令牌桶
+gdata_rate_limiter = TokenBucket(settings.EX_GDATA_RATE_LIMIT, settings.EX_GDATA_BURST)
+
+# 相同的并发请求只向上游发送一次
+gdata_flight = SingleFlight("gdata")
+gallery_page_flight = AsyncSingleFlight("gallery_page")
+full_image_flight = AsyncSingleFlight("full_image")
+
+HTML_PARSERS = ("lxml", "html.parser")
+
+# 画廊每个缩略图页面包含的图片数取决于账号的缩略图设置（20、40 等），
+# 每解析一个缩略图页面就按其"Showing X - Y of Z"更新；解析前先按 20 估算
+DEFAULT_THUMBNAILS_PER_PAGE = 20
+_thumbnails_per_page = DEFAULT_THUMBNAILS_PER_PAGE
+
+# (gid, token, 缩略图页码) -> 该页解析出的标题、图片总数与全部图片页面链接，
+# 阅读时同一缩略图页面只需下载一次，翻页只剩图片页面一次请求
+gallery_page_cache = TTLCache(settings.EX_PAGE_URL_CACHE_SIZE, settings.EX_PAGE_URL_CACHE_TTL)
+
+# (gid, token, 页码) -> fetch_full_image 的成功结果，由阅读器预读填充；
+# 图片服务器地址会过期，有效期应明显短于缩略图页面链接缓存
+image_info_cache = TTLCache(settings.EX_IMAGE_INFO_CACHE_SIZE, settings.EX_IMAGE_INFO_CACHE_TTL)
+
+
+class PageParseError(Exception):
+    """页面结构与预期不符（缺少缩略图容器、大图元素等），通常是页面改版或返回了错误页"""
+
+
+def resolve_html_parser(preferred: str = None) -> str:
+    """
+    选择页面解析后端。
+    lxml 直接使用 C 实现的 lxml.html 与 XPath 提取字段；html.parser 使用 BeautifulSoup（纯 Python），
+    auto 时优先 lxml，未安装则回退到 html.parser。
+    """
+    preferred = (preferred or settings.EX_HTML_PARSER).lower()
+    if preferred not in ("auto",) + HTML_PARSERS:
+        get_logger(__name__).warning(f"未知的 HTML 解析器: {preferred}，使用自动选择")
+        preferred = "auto"
+
+    if preferred in ("auto", "lxml"):
+        if lxml_html is not None:
+            return "lxml"
+        if preferred == "lxml":
+            get_logger(__name__).warning("lxml 未安装，回退到 html.parser")
+    return "html.parser"
+
+
+DEFAULT_HTML_PARSER = resolve_html_parser()
+
+
+def parse_html(content, parser: str = None):
+    """
+    使用指定（默认自动选择）的解析后端解析 HTML。
+    lxml 返回 lxml.html 文档根节点，html.parser 返回 BeautifulSoup；
+    下方的 parse_* 函数接受两者之一，提取结果完全一致。
+    """
+    if (parser or DEFAULT_HTML_PARSER) != "lxml":
+        return BeautifulSoup(content, "html.parser")
+    try:
+        if isinstance(content, bytes):
+            return lxml_html.document_fromstring(content, parser=_LXML_UTF8_PARSER)
+        return lxml_html.document_fromstring(content)
+    except lxml_etree.ParserError:
+        # 空文档，与 BeautifulSoup 一致地按无内容处理
+        return lxml_html.document_fromstring("<html></html>")
+
+
+def _has_class(name: str) -> str:
+    """XPath 条件：class 属性包含 name（等价于 CSS 的 .name）"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _first(node, xpath: str):
+    found = node.xpath(xpath)
+    return found[0] if found else None
+
+
+def _text(node) -> str:
+    """节点及其后代的全部文本（等价于 BeautifulSoup 的 .text）"""
+    return node.text if isinstance(node, Tag) else node.text_content()
+
+
+def _select_one(doc, css: str, xpath: str):
+    """按文档类型分别用 CSS 选择器（BeautifulSoup）或 XPath（lxml）查找第一个节点"""
+    if isinstance(doc, BeautifulSoup):
+        return doc.select_one(css)
+    return _first(doc, xpath)
+
+
+def parse_favorite_rows(doc) -> list:
+    """解析收藏夹页面中的条目（gid、token、收藏分类、收藏时间）"""
+    if isinstance(doc, BeautifulSoup):
+        rows = [
+            (
+                row.select_one('a[href*="/g/"]'),
+                row.select_one("div[title]"),
+                row.select("td.glfc p"),
+            )
+            for row in doc.select("table.itg tr")
+        ]
+    else:
+        rows = [
+            (
+                _first(row, './/a[contains(@href, "/g/")]'),
+                _first(row, ".//div[@title]"),
+                row.xpath(f".//td[{_has_class('glfc')}]//p"),
+            )
+            for row in doc.xpath(f"//table[{_has_class('itg')}]//tr")
+        ]
+
+    result = []
+    for link, fav_category_elem, fav_time_elem in rows:
+        try:
+            # 提取 gid 和 token
+            if link is None:
+                continue
+            match = re.search(r"/g/(\d+)/(\w+)", link.get("href", ""))
+            if not match:
+                continue
+            gid, token = match.groups()
+
+            # 提取分类
+            fav_category = fav_category_elem.get("title").strip() if fav_category_elem is not None else "Unknown"
+
+            # 提取收藏时间
+            fav_time = " ".join(_text(p).strip() for p in fav_time_elem) if fav_time_elem else "Unknown"
+
+            result.append(
+                {
+                    "gid": gid,
+                    "token": token,
+                    "favCategory": fav_category,
+                    "favTime": fav_time,
+                }
+            )
+        except Exception:
+            get_logger(__name__).exception("解析错误")
+    return result
+
+
+def parse_favorites_total(doc):
+    """解析收藏总数，例如 "Showing 1,234 results"；无法确定精确数量时返回 None"""
+    if isinstance(doc, BeautifulSoup):
+        text = doc.get_text(" ")
+    else:
+        text = " ".join(doc.xpath("//text()[not(ancestor::script) and not(ancestor::style)]"))
+    match = re.search(r"(?:Showing|Found)\s+([\d,]+)\s+results?", text)
+    if not match:
+        return None
+    return int(match.group(1).replace(",", ""))
+
+
+def parse_favorites_next_url(doc):
+    """解析收藏夹"下一页"链接，没有下一页时返回 None"""
+    next_link = _select_one(doc, "div.searchnav a#unext", f"//div[{_has_class('searchnav')}]//a[@id='unext']")
+    if next_link is None:
+        return None
+    return next_link.get("href")
+
+
+def parse_gallery_thumbnails(doc, page: int = 0) -> dict:
+    """
+    解析画廊页面中的缩略图与分页信息
+    """
+    soup = isinstance(doc, BeautifulSoup)
+
+    # 提取分页信息
+    pagination_info = {}
+    gpc_elem = _select_one(doc, ".gpc", f"//*[{_has_class('gpc')}]")
+    if gpc_elem is not None:
+        # 例如: "Showing 1 - 20 of 258 images"
+        match = re.search(r"Showing (\d+) - (\d+) of (\d+) images", _text(gpc_elem))
+        if match:
+            pagination_info = {
+                "start": int(match.group(1)),
+                "end": int(match.group(2)),
+                "total": int(match.group(3))
+            }
+
+    # 提取分页导航
+    page_links = []
+    ptt_elem = _select_one(doc, ".ptt", f"//*[{_has_class('ptt')}]")
+    if ptt_elem is not None:
+        for link in ptt_elem.select("td a") if soup else ptt_elem.xpath(".//td//a"):
+            href = link.get("href", "")
+            text = _text(link).strip()
+            if href and text.isdigit():
+                # 提取页码参数
+                page_match = re.search(r"p=(\d+)", href)
+                page_num = int(page_match.group(1)) if page_match else 0
+                page_links.append({
+                    "page": page_num,
+                    "display": text,
+                    "url": href
+                })
+
+    # 当前页码
+    current_page = page
+    total_pages = 0
+    if page_links:
+        total_pages = max(link["page"] for link in page_links) + 1
+
+    # 提取缩略图数据
+    thumbnails = []
+    gdt_elem = _select_one(doc, "#gdt", "//*[@id='gdt']")
+    if gdt_elem is not None:
+        for link in gdt_elem.select("a") if soup else gdt_elem.xpath(".//a"):
+            href = link.get("href", "")
+            div = link.select_one("div") if soup else _first(link, ".//div")
+            if div is not None and href:
+                title = div.get("title", "")
+                style = div.get("style", "")
+
+                # 解析背景图片URL和位置
+                bg_match = re.search(r"url\(([^)]+)\)", style)
+                pos_match = re.search(r"(-?\d+)px\s+(\d+)\s+no-repeat", style)
+                size_match = re.search(r"width:(\d+)px;height:(\d+)px", style)
+
+                thumbnail_data = {
+                    "page_url": href,
+                    "title": title,
+                }
+
+                if bg_match:
+                    thumbnail_data["background_url"] = bg_match.group(1)
+
+                if pos_match:
+                    thumbnail_data["bg_position"] = {
+                        "x": int(pos_match.group(1)),
+                        "y": int(pos_match.group(2))
+                    }
+
+                if size_match:
+                    thumbnail_data["size"] = {
+                        "width": int(size_match.group(1)),
+                        "height": int(size_match.group(2))
+                    }
+
+                # 提取页码信息
+                page_match = re.search(r"/s/[^/]+/\d+-(\d+)", href)
+                if page_match:
+                    thumbnail_data["page_number"] = int(page_match.group(1))
+
+                thumbnails.append(thumbnail_data)
+
+    return {
+        "thumbnails": thumbnails,
+        "pagination": {
+            "current_page": current_page,
+            "total_pages": total_pages,
+            "page_info": pagination_info,
+            "page_links": page_links
+        }
+    }
+
+
+def parse_gallery_page_links(doc) -> dict:
+    """
+    解析画廊缩略图页面中的标题、图片总数以及各缩略图对应的图片页面链接
+    """
+    # 获取画廊标题
+    title_elem = _select_one(doc, "#gn", "//*[@id='gn']")
+    gallery_title = _text(title_elem).strip() if title_elem is not None else "Unknown Gallery"
+
+    # 获取本页图片范围与总页数信息，例如 "Showing 41 - 80 of 258 images"
+    gpc_elem = _select_one(doc, ".gpc", f"//*[{_has_class('gpc')}]")
+    first_image = last_image = total_images = 0
+    if gpc_elem is not None:
+        match = re.search(r"Showing (\d+) - (\d+) of (\d+) images", _text(gpc_elem))
+        if match:
+            first_image, last_image, total_images = (int(value) for value in match.groups())
+
+    # 获取缩略图链接
+    gdt_elem = _select_one(doc, "#gdt", "//*[@id='gdt']")
+    if gdt_elem is None:
+        raise PageParseError("无法找到缩略图容器")
+
+    links = gdt_elem.select("a") if isinstance(doc, BeautifulSoup) else gdt_elem.xpath(".//a")
+    return {
+        "gallery_title": gallery_title,
+        "total_images": total_images,
+        "first_image": first_image,
+        "last_image": last_image,
+        "image_page_urls": [link.get("href") for link in links],
+    }
+
+
+def parse_image_page(doc) -> dict:
+    """
+    解析图片页面中的大图地址和图片名称
+    """
+    # 查找大图元素 (#i3 > a > img)
+    img_elem = _select_one(doc, "#i3 img", "//*[@id='i3']//img")
+    if img_elem is None:
+        raise PageParseError("无法找到大图元素")
+
+    image_url = img_elem.get("src")
+    image_name = img_elem.get("alt", "")
+
+    # 从图片URL中提取文件名（如果alt为空）
+    if not image_name and image_url:
+        # 从URL路径中提取文件名
+        url_parts = image_url.split("/")
+        if len(url_parts) > 1:
+            # 获取最后部分并解码
+            last_part = url_parts[-1]
+            # 移除可能的查询参数
+            if "?" in last_part:
+                last_part = last_part.split("?")[0]
+            image_name = last_part
+
+    if not image_url:
+        raise PageParseError("无法获取大图URL")
+
+    return {"image_url": image_url, "image_name": image_name}
+
+
+def gallery_page_url(gid: str, token: str, page: int = 0) -> str:
+    """画廊缩略图页面地址，页码从0开始"""
+    url = f"https://exhentai.org/g/{gid}/{token}/"
+    if page > 0:
+        url += f"?p={page}"
+    return url
+
+
+def _remember_thumbnails_per_page(gallery_page: dict, thumb_page: int):
+    """根据已解析缩略图页面的图片范围更新每页缩略图数"""
+    global _thumbnails_per_page
+    first, last, total = gallery_page["first_image"], gallery_page["last_image"], gallery_page["total_images"]
+    if not first or last < first:
+        return
+    if last < total:
+        # 非最后一页，本页图片数即每页缩略图数
+        per_page = last - first + 1
+    elif thumb_page > 0:
+        per_page = (first - 1) // thumb_page
+    else:
+        # 只有一页，无法确定
+        return
+    if per_page > 0 and per_page != _thumbnails_per_page:
+        get_logger(__name__).info(f"每页缩略图数: {per_page}")
+        _thumbnails_per_page = per_page
+
+
+def thumbnails_from_content(gid: str, token: str, page: int, content, parser: str = None) -> dict:
+    """解析画廊缩略图页面，并顺带缓存其中的图片页面链接（链接解析失败时记录日志，不影响缩略图结果）"""
+    doc = parse_html(content, parser)
+    try:
+        gallery_page = parse_gallery_page_links(doc)
+    except PageParseError:
+        get_logger(__name__).exception(f"解析图片页面链接失败: {gid} 第 {page} 页")
+    else:
+        _remember_thumbnails_per_page(gallery_page, page)
+        gallery_page_cache.set((str(gid), token, page), gallery_page)
+    return parse_gallery_thumbnails(doc, page)
+
+
+def page_links_from_content(gid: str, token: str, thumb_page: int, content, parser: str = None) -> dict:
+    """解析缩略图页面中的图片页面链接并写入缓存"""
+    gallery_page = parse_gallery_page_links(parse_html(content, parser))
+    _remember_thumbnails_per_page(gallery_page, thumb_page)
+    gallery_page_cache.set((str(gid), token, thumb_page), gallery_page)
+    return gallery_page
+
+
+def image_page_from_content(content, parser: str = None) -> dict:
+    """解析图片页面中的大图地址和图片名称"""
+    return parse_image_page(parse_html(content, parser))
+
+
+def locate_thumbnail(page: int) -> int:
+    """按当前已知的每页缩略图数估算图片页码（从1开始）所在的缩略图页面（从0开始）"""
+    return max(0, (page - 1) // _thumbnails_per_page)
+
+
+def relocate_thumbnail(gallery_page: dict, page: int):
+    """
+    检查图片是否在已获取的缩略图页面中；估算有误（此前未解析过缩略图页面、账号设置变更）时
+    返回按该页图片范围修正后的缩略图页面，否则返回 None
+    """
+    first, last = gallery_page["first_image"], gallery_page["last_image"]
+    if not first or first <= page <= last:
+        return None
+    return locate_thumbnail(page)
+
+
+def image_page_url_at(gallery_page: dict, page: int) -> str:
+    """从缩略图页面链接中取出指定图片页码（从1开始）的图片页面链接"""
+    thumb_links = gallery_page["image_page_urls"]
+    if gallery_page["first_image"]:
+        thumb_index = page - gallery_page["first_image"]
+    else:
+        thumb_index = (page - 1) % _thumbnails_per_page
+    if not 0 <= thumb_index < len(thumb_links):
+        raise Exception(f"缩略图索引超出范围: {thumb_index} >= {len(thumb_links)}")
+
+    image_page_url = thumb_links[thumb_index]
+    if not image_page_url:
+        raise Exception("无法获取图片页面链接")
+    return image_page_url
+
+
+def full_image_result(gid: str, token: str, page: int, gallery_page: dict, image_page_url: str, image_info: dict) -> dict:
+    """组装 fetch_full_image 的返回结果并写入 image_info_cache"""
+    result = {
+        "imageUrl": image_info["image_url"],
+        "imageName": image_info["image_name"],
+        "galleryTitle": gallery_page["gallery_title"],
+        "currentPage": page,
+        "totalPages": gallery_page["total_images"],
+        "imagePageUrl": image_page_url
+    }
+    image_info_cache.set((str(gid), token, page), result)
+    return result
+
+
+def full_image_error(page: int, error: Exception) -> dict:
+    return {
+        "error": str(error),
+        "imageUrl": "",
+        "imageName": "",
+        "galleryTitle": "",
+        "currentPage": page,
+        "totalPages": 0
+    }
+
+
+def thumbnails_error(error: Exception) -> dict:
+    return {
+        "thumbnails": [],
+        "pagination": {
+            "current_page": 0,
+            "total_pages": 0,
+            "page_info": {},
+            "page_links": []
+        },
+        "error": str(error)
+    }
 
 
 class ExHentaiUtils:
-    def __init__(self, base_url, cookies: dict, logger=None):
+    def __init__(self, base_url, cookies: dict, logger=None, html_parser: str = None, session=None, timeout=None):
+        """
+        参数:
+            session: 可选的共享 requests.Session（如应用级连接池），页面与 gdata 接口请求都经由该会话；
+                不传则创建独立会话，用完后需调用 close()（或使用 with 语句）释放
+            timeout: 页面请求超时，可以是秒数或 (连接, 读取) 元组
+        """
         self.base_url = base_url
         self.cookies = cookies
         self.logger = logger or get_logger(__name__)
-        self.session = requests.Session()
-        self.session.cookies.update(cookies)
+        self.html_parser = html_parser or DEFAULT_HTML_PARSER
+        self.timeout = timeout
+        # 共享会话不写入 cookies，改为随每个请求携带，避免修改其他使用者的状态
+        self._owns_session = session is None
+        self.session = session or requests.Session()
+        if self._owns_session:
+            self.session.cookies.update(cookies)
+
+        if self._owns_session:
+            # gdata 接口专用会话，连接池大小与并发数一致，批次之间复用连接
+            self.api_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, settings.EX_GDATA_WORKERS))
+            self.api_session.mount("https://", adapter)
+            self.api_session.mount("http://", adapter)
+        else:
+            self.api_session = session
+
+    def close(self):
+        """关闭自行创建的会话，共享会话由其所有者负责关闭"""
+        if self._owns_session:
+            self.session.close()
+            self.api_session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _get(self, url: str):
+        """发起页面请求"""
+        return self.session.get(url, cookies=None if self._owns_session else self.cookies, timeout=self.timeout)
 
     def extract_favorites(self):
         """
         按页提取收藏夹中的本子信息，包括 gid、token、分类和收藏时间。
         """
         result = []
+        for records, _ in self.iter_favorite_pages():
+            result.extend(records)
+        return result
+
+    def iter_favorite_pages(self):
+        """
+        逐页抓取收藏夹，每抓取一页即产出 (该页记录列表, 收藏总数)。
+        收藏总数无法从页面解析时为 None。调用方可以随时停止迭代以提前结束爬取。
+
+        异常:
+            RuntimeError: 某一页请求失败（限流、509、Cookie 失效等）。迭代正常结束即表示已爬取到最后一页，
+                调用方据此判断未出现的收藏是否已被取消，不能把失败当作到达末页
+        """
         next_page = self.base_url
+        page_count = 0
+        record_count = 0
+        start_time = time.monotonic()
 
         while next_page:
             self.logger.info(f"正在爬取: {next_page}")
-            response = self.session.get(next_page)
+            response = self._get(next_page)
             if response.status_code != 200:
-                self.logger.error(f"请求失败，状态码: {response.status_code}")
-                break
-
-            soup = BeautifulSoup(response.content, "html.parser")
-            rows = soup.select("table.itg tr")
-
-            for row in rows:
-                try:
-                    # 提取 gid 和 token
-                    link = row.select_one('a[href*="/g/"]')
-                    if not link:
-                        continue
-                    match = re.search(r"/g/(\d+)/(\w+)", link["href"])
-                    if not match:
-                        continue
-                    gid, token = match.groups()
-
-                    # 提取分类
-                    fav_category_elem = row.select_one("div[title]")
-                    fav_category = fav_category_elem["title"].strip() if fav_category_elem else "Unknown"
-
-                    # 提取收藏时间
-                    fav_time_elem = row.select("td.glfc p")
-                    fav_time = " ".join(p.text.strip() for p in fav_time_elem) if fav_time_elem else "Unknown"
-
-                    result.append(
-                        {
-                            "gid": gid,
-                            "token": token,
-                            "favCategory": fav_category,
-                            "favTime": fav_time,
-                        }
-                    )
-                except Exception:
-                    self.logger.exception("解析错误")
+                error_msg = f"收藏页请求失败，状态码: {response.status_code}（{next_page}）"
+                self.logger.error(error_msg)
+                raise RuntimeError(error_msg)
+
+            doc = parse_html(response.content, self.html_parser)
+            records = parse_favorite_rows(doc)
+            total = parse_favorites_total(doc)
 
             # 获取下一页链接
-            next_link = soup.select_one("div.searchnav a#unext")
-            if next_link and "href" in next_link.attrs:
-                next_page = (
-                    next_link["href"]
-                    if next_link["href"].startswith("http")
-                    else self.base_url.rsplit("/", 1)[0] + next_link["href"]
-                )
+            next_href = parse_favorites_next_url(doc)
+            if next_href:
+                next_page = next_href if next_href.startswith("http") else self.base_url.rsplit("/", 1)[0] + next_href
             else:
                 next_page = None
 
-        return result
+            page_count += 1
+            record_count += len(records)
+            elapsed = max(time.monotonic() - start_time, 1e-6)
+            self.logger.info(f"收藏页进度: 已爬取 {page_count} 页，{record_count} 项，{page_count / elapsed:.2f} 页/秒")
+
+            yield records, total
 
-    def fetch_gallery_metadatas(self, favorites: list, max_retries: int = 5, retry_delay: float = 2.0):
+    def fetch_gallery_metadatas(
+        self, favorites: list, max_retries: int = 5, retry_delay: float = 2.0, workers: int = None
+    ):
         """
-        批量获取画廊元数据，带重试机制确保数据完整性和顺序一致性
+        批量获取画廊元数据，多个批次并发请求，带重试机制确保数据完整性和顺序一致性
 
         参数:
             favorites: List[dict]，包含 'gid' 和 'token'
-            max_retries: 最大重试次数（默认5次）
-            retry_delay: 重试延迟秒数（默认2秒）
+            max_retries: 每个批次的最大重试次数（默认5次）
+            retry_delay: 首次重试的延迟秒数，之后按指数退避（默认2秒）
+            workers: 并发请求数，默认读取 EX_GDATA_WORKERS 配置
 
         返回:
             List[dict]，每个本子的元数据（保持原始顺序）
-            
+
         异常:
             如果有批次在重试后仍然失败，抛出异常
         """
-        import time
-        
-        url = "https://api.e-hentai.org/api.php"
-        # 使用字典存储批次数据，key为批次开始索引，确保顺序
+        return self.fetch_metadata_pipeline([favorites], max_retries=max_retries, retry_delay=retry_delay, workers=workers)
+
+    def fetch_metadata_pipeline(
+        self, record_pages, max_retries: int = 5, retry_delay: float = 2.0, workers: int = None
+    ):
+        """
+        流水线方式获取画廊元数据：record_pages 每产出一页记录就放入缓冲区，
+        凑满一批（25条）立即提交给并发的 gdata 请求，收藏页爬取与元数据请求同时进行。
+
+        参数:
+            record_pages: 可迭代对象，每次产出一组包含 'gid' 和 'token' 的记录
+            max_retries / retry_delay / workers: 同 fetch_gallery_metadatas
+
+        返回:
+            List[dict]，每个本子的元数据（保持记录的产出顺序）
+
+        异常:
+            如果有批次在重试后仍然失败，或 record_pages 抛出异常（如收藏页请求失败），抛出异常
+        """
+        workers = max(1, workers or settings.EX_GDATA_WORKERS)
+        # 使用字典存储批次数据，key为批次序号，确保顺序
         batch_results = {}
         failed_batches = []
-        total_batches = (len(favorites) + 24) // 25
-        
-        self.logger.info(f"开始获取元数据，共 {total_batches} 批，每批最多25条")
+        futures = []
+        lock = threading.Lock()
+        # 任一批次最终失败后通知其余批次停止，并停止继续爬取
+        abort_event = threading.Event()
+        progress = {"submitted": 0, "fetched": 0}
+        start_time = time.monotonic()
+
+        self.logger.info(f"开始获取元数据，每批最多{GDATA_BATCH_SIZE}条，并发数 {workers}")
+
+        def on_batch_done(future, batch_num):
+            if future.cancelled():
+                return
+            success, batch_data = future.result()
+            with lock:
+                if not success:
+                    if batch_data is not None:
+                        failed_batches.append(batch_num)
+                    abort_event.set()
+                    return
+                batch_results[batch_num] = batch_data
+                progress["fetched"] += len(batch_data)
+                fetched, submitted = progress["fetched"], progress["submitted"]
+            elapsed = max(time.monotonic() - start_time, 1e-6)
+            self.logger.info(f"元数据进度: {fetched}/{submitted} 项，{fetched / elapsed:.1f} 项/秒")
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+
+            def submit(batch):
+                batch_num = len(futures) + 1
+                with lock:
+                    progress["submitted"] += len(batch)
+                future = executor.submit(
+                    self._fetch_batch_with_backoff, GDATA_API_URL, batch, batch_num, max_retries, retry_delay, abort_event
+                )
+                futures.append(future)
+                future.add_done_callback(lambda f: on_batch_done(f, batch_num))
+
+            buffer = []
+            try:
+                for records in record_pages:
+                    if abort_event.is_set():
+                        break
+                    buffer.extend(records)
+                    while len(buffer) >= GDATA_BATCH_SIZE:
+                        submit(buffer[:GDATA_BATCH_SIZE])
+                        buffer = buffer[GDATA_BATCH_SIZE:]
+            except BaseException:
+                # 爬取中断时结果必然不完整，停止尚未完成的批次
+                abort_event.set()
+                for future in futures:
+                    future.cancel()
+                raise
+            if buffer and not abort_event.is_set():
+                submit(buffer)
+
+            if abort_event.is_set():
+                for future in futures:
+                    future.cancel()
 
-        # 第一轮：处理所有批次
-        for i in range(0, len(favorites), 25):
-            batch = favorites[i : i + 25]
-            batch_num = i // 25 + 1
-            
-            success, batch_data = self._fetch_single_batch_with_result(url, batch, batch_num)
-            if success:
-                batch_results[i] = batch_data
-            else:
-                failed_batches.append((i, batch, batch_num))
-        
-        # 重试失败的批次
-        if failed_batches:
-            self.logger.warning(f"第一轮完成，有 {len(failed_batches)} 个批次失败，开始重试...")
-            
-            for retry_round in range(1, max_retries + 1):
-                if not failed_batches:
-                    break
-                    
-                self.logger.info(f"第 {retry_round} 轮重试，处理 {len(failed_batches)} 个失败批次...")
-                remaining_failed = []
-                
-                for i, batch, batch_num in failed_batches:
-                    self.logger.info(f"重试第 {batch_num} 批（第{retry_round}次重试）...")
-                    time.sleep(retry_delay)  # 延迟重试
-                    
-                    success, batch_data = self._fetch_single_batch_with_result(url, batch, batch_num)
-                    if success:
-                        batch_results[i] = batch_data
-                    else:
-                        remaining_failed.append((i, batch, batch_num))
-                
-                failed_batches = remaining_failed
-                
-                if failed_batches:
-                    self.logger.warning(f"第 {retry_round} 轮重试完成，还有 {len(failed_batches)} 个批次失败")
-                else:
-                    self.logger.info(f"第 {retry_round} 轮重试完成，所有批次成功！")
-                    break
-        
         # 检查是否还有失败的批次
-        if failed_batches:
-            failed_batch_nums = [str(batch_num) for _, _, batch_num in failed_batches]
-            error_msg = f"经过 {max_retries} 次重试后，仍有 {len(failed_batches)} 个批次失败（批次: {', '.join(failed_batch_nums)}），为保证数据完整性，同步已终止"
+        if failed_batches or len(batch_results) != len(futures):
+            failed_batch_nums = sorted(failed_batches)
+            error_msg = f"经过 {max_retries} 次重试后，仍有批次失败（批次: {', '.join(map(str, failed_batch_nums))}），为保证数据完整性，同步已终止"
             self.logger.error(error_msg)
             raise RuntimeError(error_msg)
-        
+
         # 按原始顺序组装最终结果
         all_metadata = []
-        for i in range(0, len(favorites), 25):
-            if i in batch_results:
-                all_metadata.extend(batch_results[i])
-        
-        self.logger.info(f"所有批次处理完成，成功获取 {len(all_metadata)} 条元数据（顺序已保持）")
+        for batch_num in range(1, len(futures) + 1):
+            all_metadata.extend(batch_results[batch_num])
+
+        elapsed = max(time.monotonic() - start_time, 1e-6)
+        self.logger.info(
+            f"所有批次处理完成，共 {len(futures)} 批，成功获取 {len(all_metadata)} 条元数据（顺序已保持），"
+            f"平均 {len(all_metadata) / elapsed:.1f} 项/秒"
+        )
         return all_metadata
-    
+
+    def _fetch_batch_with_backoff(
+        self, url: str, batch: list, batch_num: int, max_retries: int, retry_delay: float, abort_event=None
+    ) -> tuple:
+        """
+        获取单个批次，失败时按指数退避独立重试，不影响其他批次
+
+        返回:
+            tuple: (是否成功, 数据列表)，因其他批次失败而放弃时数据为 None
+        """
+        for attempt in range(max_retries + 1):
+            if abort_event is not None and abort_event.is_set():
+                # 其他批次已最终失败，放弃本批次
+                return False, None
+
+            if attempt > 0:
+                delay = min(MAX_BACKOFF_DELAY, retry_delay * 2 ** (attempt - 1))
+                delay += random.uniform(0, retry_delay)  # 抖动，避免多个批次同时重试
+                self.logger.info(f"{delay:.1f} 秒后重试第 {batch_num} 批（第{attempt}次重试）...")
+                time.sleep(delay)
+
+            gdata_rate_limiter.acquire()
+            success, data = self._fetch_single_batch_with_result(url, batch, batch_num)
+            if success:
+                return True, data
+
+        return False, []
+
     def _fetch_single_batch_with_result(self, url: str, batch: list, batch_num: int) -> tuple:
         """
         获取单个批次的数据，返回数据和成功状态
@@ -171,9 +725,8 @@ class ExHentaiUtils:
         self.logger.info(f"正在请求第 {batch_num} 批，共 {len(batch)} 条数据...")
         
         try:
-            res = requests.post(url, json=payload, timeout=30)
-            res.raise_for_status()
-            data = res.json().get("gmetadata", [])
+            key = tuple((gid, token) for gid, token in gidlist)
+            data = gdata_flight.do(key, self._post_gdata, url, payload)
             
             if len(data) != len(batch):
                 self.logger.warning(f"第 {batch_num} 批返回数据不完整：期望 {len(batch)} 条，实际 {len(data)} 条")
@@ -185,6 +738,11 @@ class ExHentaiUtils:
             self.logger.error(f"第 {batch_num} 批请求失败: {str(e)}")
             return False, []
 
+    def _post_gdata(self, url: str, payload: dict) -> list:
+        res = self.api_session.post(url, json=payload, timeout=30)
+        res.raise_for_status()
+        return res.json().get("gmetadata", [])
+
     def _fetch_single_batch(self, url: str, batch: list, batch_num: int, all_metadata: list) -> bool:
         """
         获取单个批次的数据（兼容性方法）
@@ -199,14 +757,14 @@ class ExHentaiUtils:
 
     def get_favorites_metadata(self, max_retries: int = 5, retry_delay: float = 2.0):
         """
-        高层封装：从收藏夹获取所有本子元数据。
+        高层封装：从收藏夹获取所有本子元数据，爬取收藏页的同时请求元数据。
         
         参数:
             max_retries: 最大重试次数
             retry_delay: 重试延迟秒数
         """
-        favorites = self.extract_favorites()
-        return self.fetch_gallery_metadatas(favorites, max_retries=max_retries, retry_delay=retry_delay)
+        record_pages = (records for records, _ in self.iter_favorite_pages())
+        return self.fetch_metadata_pipeline(record_pages, max_retries=max_retries, retry_delay=retry_delay)
 
     def export_favorites_metadata(self, output_path="favorites_metadata.json"):
         """
@@ -230,229 +788,95 @@ class ExHentaiUtils:
         except Exception:
             self.logger.exception("保存失败")
 
-    def fetch_gallery_thumbnails(self, gid: str, token: str, page: int = 0):
+
+class AsyncExHentaiUtils:
+    """
+    画廊缩略图与大图信息的客户端，供阅读器、批量 OCR 等路由使用（同步的 ExHentaiUtils 只负责收藏夹同步）。
+
+    基于应用级共享的 httpx.AsyncClient，页面请求不占用线程池；
+    页面解析与结果组装由模块级函数完成，解析在线程池中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, cookies: dict, client=None, logger=None, html_parser: str = None):
+        self.http = client or exhentai_async_client
+        self.cookie_header = build_cookie_header(cookies)
+        self.logger = logger or get_logger(__name__)
+        self.html_parser = html_parser or DEFAULT_HTML_PARSER
+
+    async def _get(self, url: str):
+        """发起页面请求，非 2xx 状态抛出异常；同一页面的并发请求合并为一次"""
+        return await gallery_page_flight.do(url, self._download, url)
+
+    async def _download(self, url: str):
+        response = await self.http.get(url, headers={"Cookie": self.cookie_header})
+        response.raise_for_status()
+        return response
+
+    async def fetch_gallery_thumbnails(self, gid: str, token: str, page: int = 0):
         """
         获取画廊的缩略图数据
-        
+
         参数:
             gid: Gallery ID
-            token: Gallery token  
+            token: Gallery token
             page: 页码，从0开始
-            
+
         返回:
             dict: 包含缩略图数据、分页信息等
         """
-        url = f"https://exhentai.org/g/{gid}/{token}/"
-        if page > 0:
-            url += f"?p={page}"
-            
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, "html.parser")
-            
-            # 提取分页信息
-            pagination_info = {}
-            gpc_elem = soup.select_one(".gpc")
-            if gpc_elem:
-                # 例如: "Showing 1 - 20 of 258 images"
-                match = re.search(r"Showing (\d+) - (\d+) of (\d+) images", gpc_elem.text)
-                if match:
-                    pagination_info = {
-                        "start": int(match.group(1)),
-                        "end": int(match.group(2)), 
-                        "total": int(match.group(3))
-                    }
-            
-            # 提取分页导航
-            page_links = []
-            ptt_elem = soup.select_one(".ptt")
-            if ptt_elem:
-                for link in ptt_elem.select("td a"):
-                    href = link.get("href", "")
-                    text = link.text.strip()
-                    if href and text.isdigit():
-                        # 提取页码参数
-                        page_match = re.search(r"p=(\d+)", href)
-                        page_num = int(page_match.group(1)) if page_match else 0
-                        page_links.append({
-                            "page": page_num,
-                            "display": text,
-                            "url": href
-                        })
-                        
-            # 当前页码
-            current_page = page
-            total_pages = 0
-            if page_links:
-                total_pages = max(link["page"] for link in page_links) + 1
-            
-            # 提取缩略图数据
-            thumbnails = []
-            gdt_elem = soup.select_one("#gdt")
-            if gdt_elem:
-                for link in gdt_elem.select("a"):
-                    href = link.get("href", "")
-                    div = link.select_one("div")
-                    if div and href:
-                        title = div.get("title", "")
-                        style = div.get("style", "")
-                        
-                        # 解析背景图片URL和位置
-                        bg_match = re.search(r"url\(([^)]+)\)", style)
-                        pos_match = re.search(r"(-?\d+)px\s+(\d+)\s+no-repeat", style)
-                        size_match = re.search(r"width:(\d+)px;height:(\d+)px", style)
-                        
-                        thumbnail_data = {
-                            "page_url": href,
-                            "title": title,
-                        }
-                        
-                        if bg_match:
-                            thumbnail_data["background_url"] = bg_match.group(1)
-                            
-                        if pos_match:
-                            thumbnail_data["bg_position"] = {
-                                "x": int(pos_match.group(1)),
-                                "y": int(pos_match.group(2))
-                            }
-                            
-                        if size_match:
-                            thumbnail_data["size"] = {
-                                "width": int(size_match.group(1)),
-                                "height": int(size_match.group(2))
-                            }
-                            
-                        # 提取页码信息
-                        page_match = re.search(r"/s/[^/]+/\d+-(\d+)", href)
-                        if page_match:
-                            thumbnail_data["page_number"] = int(page_match.group(1))
-                            
-                        thumbnails.append(thumbnail_data)
-            
-            return {
-                "thumbnails": thumbnails,
-                "pagination": {
-                    "current_page": current_page,
-                    "total_pages": total_pages,
-                    "page_info": pagination_info,
-                    "page_links": page_links
-                }
-            }
-            
+            response = await self._get(gallery_page_url(gid, token, page))
+            return await asyncio.to_thread(thumbnails_from_content, gid, token, page, response.content, self.html_parser)
+
         except Exception as e:
             self.logger.error(f"获取缩略图失败: {e}")
-            return {
-                "thumbnails": [],
-                "pagination": {
-                    "current_page": 0,
-                    "total_pages": 0,
-                    "page_info": {},
-                    "page_links": []
-                },
-                "error": str(e)
-            }
+            return thumbnails_error(e)
 
-    def fetch_full_image(self, gid: str, token: str, page: int):
+    async def fetch_full_image(self, gid: str, token: str, page: int):
         """
         获取画廊的完整大图信息
-        
+
         参数:
             gid: Gallery ID
             token: Gallery token
             page: 页码，从1开始（用户界面显示）
-            
+
         返回:
             dict: 包含大图URL、图片名称、画廊标题等信息
         """
-        # 首先获取缩略图页面的跳转链接
-        thumb_page = max(0, (page - 1) // 20)  # 缩略图页面从0开始
-        thumb_index = (page - 1) % 20  # 该页面中第几个缩略图
-        
+        cached = image_info_cache.get((str(gid), token, page))
+        if cached is not None:
+            return dict(cached)
+
+        # 同一页的并发请求（多个标签页、预读与翻页同时发生）共享一次解析
+        result = await full_image_flight.do((str(gid), token, page), self._resolve_full_image, gid, token, page)
+        return dict(result)
+
+    async def _resolve_full_image(self, gid: str, token: str, page: int):
         try:
-            # 获取缩略图页面
-            thumb_url = f"https://exhentai.org/g/{gid}/{token}/"
-            if thumb_page > 0:
-                thumb_url += f"?p={thumb_page}"
-                
-            response = self.session.get(thumb_url)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, "html.parser")
-            
-            # 获取画廊标题
-            title_elem = soup.select_one("#gn")
-            gallery_title = title_elem.text.strip() if title_elem else "Unknown Gallery"
-            
-            # 获取总页数信息
-            gpc_elem = soup.select_one(".gpc")
-            total_images = 0
-            if gpc_elem:
-                match = re.search(r"Showing \d+ - \d+ of (\d+) images", gpc_elem.text)
-                if match:
-                    total_images = int(match.group(1))
-            
-            # 获取缩略图链接
-            gdt_elem = soup.select_one("#gdt")
-            if not gdt_elem:
-                raise Exception("无法找到缩略图容器")
-                
-            thumb_links = gdt_elem.select("a")
-            if thumb_index >= len(thumb_links):
-                raise Exception(f"缩略图索引超出范围: {thumb_index} >= {len(thumb_links)}")
-            
-            # 获取指定缩略图的跳转链接
-            target_link = thumb_links[thumb_index]
-            image_page_url = target_link.get("href")
-            if not image_page_url:
-                raise Exception("无法获取图片页面链接")
-            
-            # 访问图片页面获取大图信息
-            image_response = self.session.get(image_page_url)
-            image_response.raise_for_status()
-            
-            image_soup = BeautifulSoup(image_response.content, "html.parser")
-            
-            # 查找大图元素 (#i3 > a > img)
-            img_elem = image_soup.select_one("#i3 img")
-            if not img_elem:
-                raise Exception("无法找到大图元素")
-            
-            image_url = img_elem.get("src")
-            image_name = img_elem.get("alt", "")
-            
-            # 从图片URL中提取文件名（如果alt为空）
-            if not image_name and image_url:
-                # 从URL路径中提取文件名
-                url_parts = image_url.split("/")
-                if len(url_parts) > 1:
-                    # 获取最后部分并解码
-                    last_part = url_parts[-1]
-                    # 移除可能的查询参数
-                    if "?" in last_part:
-                        last_part = last_part.split("?")[0]
-                    image_name = last_part
-            
-            if not image_url:
-                raise Exception("无法获取大图URL")
-            
-            return {
-                "imageUrl": image_url,
-                "imageName": image_name,
-                "galleryTitle": gallery_title,
-                "currentPage": page,
-                "totalPages": total_images,
-                "imagePageUrl": image_page_url
-            }
-            
+            gallery_page = await self.get_gallery_page_links(gid, token, locate_thumbnail(page))
+            thumb_page = relocate_thumbnail(gallery_page, page)
+            if thumb_page is not None:
+                gallery_page = await self.get_gallery_page_links(gid, token, thumb_page)
+            image_page_url = image_page_url_at(gallery_page, page)
+
+            image_response = await self._get(image_page_url)
+            image_info = await asyncio.to_thread(image_page_from_content, image_response.content, self.html_parser)
+
+            return full_image_result(gid, token, page, gallery_page, image_page_url, image_info)
+
         except Exception as e:
             self.logger.error(f"获取大图失败: {e}")
-            return {
-                "error": str(e),
-                "imageUrl": "",
-                "imageName": "",
-                "galleryTitle": "",
-                "currentPage": page,
-                "totalPages": 0
-            }
+            return full_image_error(page, e)
+
+    async def get_gallery_page_links(self, gid: str, token: str, thumb_page: int) -> dict:
+        """
+        获取缩略图页面的图片页面链接，命中缓存时不发起请求
+        """
+        gallery_page = gallery_page_cache.get((str(gid), token, thumb_page))
+        if gallery_page is None:
+            response = await self._get(gallery_page_url(gid, token, thumb_page))
+            gallery_page = await asyncio.to_thread(
+                page_links_from_content, gid, token, thumb_page, response.content, self.html_parser
+            )
+        return gallery_page
@@ -0,0 +1,137 @@
+# app/utils/gallery_search_index.py
+
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+# 标题分词：连续的字母/数字/CJK 字符视为一个词
+_TOKEN_PATTERN = re.compile(r"\w+")
+# 词表子串检索使用的 n-gram 长度
+_NGRAM_SIZE = 3
+
+
+def _ngrams(text: str) -> Set[str]:
+    return {text[i : i + _NGRAM_SIZE] for i in range(len(text) - _NGRAM_SIZE + 1)}
+
+
+class SubstringVocabulary:
+    """
+    去重词表的子串检索。
+    对每个词条建立 n-gram → 词条 的倒排，查询时先用关键词的 n-gram 求交集得到候选词条，
+    再做一次子串校验。耗时只与词表规模相关，与图库条目数无关。
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: List[str] = list(dict.fromkeys(terms))
+        grams: Dict[str, Set[str]] = defaultdict(set)
+        for term in self.terms:
+            for gram in _ngrams(term):
+                grams[gram].add(term)
+        self.grams: Dict[str, Set[str]] = dict(grams)
+
+    def find(self, kw: str) -> List[str]:
+        """返回所有包含 kw 的词条"""
+        if len(kw) < _NGRAM_SIZE:
+            # 关键词过短无法使用 n-gram，退化为词表扫描
+            return [term for term in self.terms if kw in term]
+
+        postings = [self.grams.get(gram) for gram in _ngrams(kw)]
+        if not all(postings):
+            return []
+        postings.sort(key=len)
+
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            candidates &= other
+            if not candidates:
+                return []
+        return [term for term in candidates if kw in term]
+
+
+class GallerySearchIndex:
+    """
+    图库搜索倒排索引，在加载图库数据时一次性构建。
+
+    - 标题：分词后 token → 条目位置
+    - 标签：完整的 namespace:value → 条目位置
+    - 分类：category → 条目位置
+    - gid：gid → 条目（重复 gid 以第一条为准）
+    - 子串回退：标题 token 与标签各自的词表 n-gram 索引
+
+    搜索语义与原先的线性扫描完全一致（关键词为标题或任一标签的子串即命中），
+    结果按原始数据顺序返回。
+    """
+
+    def __init__(self, items: List[dict]):
+        self.items = items
+        self.by_gid: Dict[int, dict] = {}
+        self._titles: List[str] = []
+
+        title_postings: Dict[str, Set[int]] = defaultdict(set)
+        tag_postings: Dict[str, Set[int]] = defaultdict(set)
+        category_postings: Dict[str, List[int]] = defaultdict(list)
+
+        for pos, item in enumerate(items):
+            self.by_gid.setdefault(item.get("gid"), item)
+
+            title = str(item.get("title") or "").lower()
+            self._titles.append(title)
+            for token in _TOKEN_PATTERN.findall(title):
+                title_postings[token].add(pos)
+
+            tags = item.get("tags", [])
+            if isinstance(tags, list):
+                for tag in tags:
+                    if isinstance(tag, str):
+                        tag_postings[tag.lower()].add(pos)
+
+            category_postings[item.get("category")].append(pos)
+
+        self.title_postings: Dict[str, Set[int]] = dict(title_postings)
+        self.tag_postings: Dict[str, Set[int]] = dict(tag_postings)
+        self.category_postings: Dict[str, List[int]] = dict(category_postings)
+        self._category_sets: Dict[str, Set[int]] = {k: set(v) for k, v in self.category_postings.items()}
+
+        self.title_vocabulary = SubstringVocabulary(self.title_postings)
+        self.tag_vocabulary = SubstringVocabulary(self.tag_postings)
+
+    def _match_titles(self, kw: str) -> Set[int]:
+        tokens = _TOKEN_PATTERN.findall(kw)
+        if not tokens:
+            # 关键词不含任何单词字符（如纯符号），只能逐条比对
+            return {pos for pos, title in enumerate(self._titles) if kw in title}
+
+        candidates: Optional[Set[int]] = None
+        for token in sorted(set(tokens), key=len, reverse=True):
+            matched: Set[int] = set()
+            for term in self.title_vocabulary.find(token):
+                matched |= self.title_postings[term]
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return set()
+
+        if len(tokens) == 1 and tokens[0] == kw:
+            # 单个 token 的子串必然落在某个标题 token 内部，无需再校验
+            return candidates
+        return {pos for pos in candidates if kw in self._titles[pos]}
+
+    def _match_tags(self, kw: str) -> Set[int]:
+        matched: Set[int] = set()
+        for term in self.tag_vocabulary.find(kw):
+            matched |= self.tag_postings[term]
+        return matched
+
+    def search(self, keyword: Optional[str] = None, category: Optional[str] = None) -> List[int]:
+        """
+        返回命中条目在 items 中的位置（升序）。
+        """
+        if not keyword:
+            if category:
+                return self.category_postings.get(category, [])
+            return list(range(len(self.items)))
+
+        kw = keyword.lower()
+        matched = self._match_titles(kw) | self._match_tags(kw)
+        if category:
+            matched &= self._category_sets.get(category, set())
+        return sorted(matched)
@@ -0,0 +1,78 @@
+# app/utils/gallery_stats.py
+
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+FIXED_CATEGORIES = [
+    "Doujinshi",
+    "Manga",
+    "Artist CG",
+    "Game CG",
+    "Western",
+    "Non-H",
+    "Image Set",
+    "Cosplay",
+    "Asian Porn",
+    "Misc",
+]
+
+
+class GalleryStatsAggregate:
+    """
+    图库统计聚合，在加载图库数据时一次性计算，之后的统计接口直接读取内存结果。
+
+    - 分类计数（固定分类）
+    - 季度直方图（UTC）
+    - 标签计数：全部标签及各 namespace 下预先排好序的 (tag, count) 列表
+    """
+
+    def __init__(self, items: List[dict]):
+        self.total = len(items)
+        self.category_counts: Dict[str, int] = {cat: 0 for cat in FIXED_CATEGORIES}
+
+        quarter_counts: Dict[str, int] = defaultdict(int)
+        tag_counter: Counter = Counter()
+
+        for item in items:
+            category = item.get("category")
+            if category in self.category_counts:
+                self.category_counts[category] += 1
+
+            quarter = self._quarter_of(item.get("posted"))
+            if quarter:
+                quarter_counts[quarter] += 1
+
+            tags = item.get("tags", [])
+            if isinstance(tags, list):
+                tag_counter.update(tag for tag in tags if isinstance(tag, str))
+
+        self.quarterly: List[dict] = [{"quarter": k, "count": v} for k, v in sorted(quarter_counts.items())]
+
+        # most_common 的并列顺序按首次出现，过滤后的子序列顺序与单独计数完全一致
+        self.top_tags: List[Tuple[str, int]] = tag_counter.most_common()
+        namespace_tags: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+        for tag, count in self.top_tags:
+            if ":" in tag:
+                namespace_tags[tag.split(":", 1)[0]].append((tag, count))
+        self.namespace_top_tags: Dict[str, List[Tuple[str, int]]] = dict(namespace_tags)
+
+    @staticmethod
+    def _quarter_of(posted) -> Optional[str]:
+        if not posted:
+            return None
+        try:
+            dt = datetime.fromtimestamp(int(posted), tz=timezone.utc)
+        except (ValueError, TypeError, OverflowError, OSError):
+            return None
+        return f"{dt.year}-Q{(dt.month - 1) // 3 + 1}"
+
+    def most_common_tags(self, n: int, namespace: Optional[str] = None) -> List[Tuple[str, int]]:
+        """返回前 n 个最常见标签，可按 namespace 过滤"""
+        if not namespace:
+            return self.top_tags[:n]
+        if ":" in namespace:
+            # 过滤条件本身含冒号时无法对应单个 namespace，按前缀筛选
+            prefix = f"{namespace}:"
+            return [entry for entry in self.top_tags if entry[0].startswith(prefix)][:n]
+        return self.namespace_top_tags.get(namespace, [])[:n]
@@ -0,0 +1,211 @@
+# app/utils/http_client.py
+
+import threading
+
+import httpx
+import requests
+from core.config import settings
+from core.logger import get_logger
+from requests.adapters import HTTPAdapter
+
+logger = get_logger(__name__)
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Referer": "https://exhentai.org/",
+}
+
+
+class _TrackingAdapter(HTTPAdapter):
+    """记录请求总数与正在进行中请求数的连接池适配器"""
+
+    def __init__(self, *args, **kwargs):
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0
+        self.total_requests = 0
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        with self._stats_lock:
+            self.in_flight += 1
+            self.total_requests += 1
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+
+
+class PooledHttpClient:
+    """
+    应用级共享的 keep-alive HTTP 客户端。
+
+    由 FastAPI lifespan 负责创建与关闭，所有访问 ExHentai 的路由以及 OCR 图片下载共用同一个连接池，
+    翻页等连续请求复用已建立的 TCP/TLS 连接。未经 lifespan 启动时（如脚本中直接调用）会在首次使用时自动创建。
+    """
+
+    def __init__(self, pool_size: int, pool_hosts: int, connect_timeout: float, read_timeout: float):
+        self.pool_size = pool_size
+        self.pool_hosts = pool_hosts
+        self.timeout = (connect_timeout, read_timeout)
+        self._session = None
+        self._adapter = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._session is not None:
+                return
+            adapter = _TrackingAdapter(pool_connections=self.pool_hosts, pool_maxsize=self.pool_size)
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._adapter = adapter
+            self._session = session
+        logger.info(f"共享 HTTP 客户端已启动，每个主机连接池大小 {self.pool_size}，超时 {self.timeout}")
+
+    def close(self):
+        with self._lock:
+            session, self._session, self._adapter = self._session, None, None
+        if session is not None:
+            session.close()
+            logger.info("共享 HTTP 客户端已关闭")
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            self.start()
+        return self._session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def stats(self) -> dict:
+        """返回连接池使用情况"""
+        adapter = self._adapter
+        if adapter is None:
+            return {"started": False, "pool_size": self.pool_size, "pools": []}
+
+        pools = []
+        container = adapter.poolmanager.pools
+        for key in container.keys():
+            pool = container.get(key)
+            if pool is None:
+                continue
+            queue = getattr(pool, "pool", None)
+            idle = sum(1 for conn in list(queue.queue) if conn is not None) if queue is not None else 0
+            pools.append(
+                {
+                    "host": f"{key.key_scheme}://{key.key_host}:{key.key_port or ''}".rstrip(":"),
+                    "connections_created": pool.num_connections,
+                    "requests": pool.num_requests,
+                    "idle_connections": idle,
+                }
+            )
+
+        return {
+            "started": True,
+            "pool_size": self.pool_size,
+            "pool_hosts": self.pool_hosts,
+            "timeout": {"connect": self.timeout[0], "read": self.timeout[1]},
+            "in_flight": adapter.in_flight,
+            "total_requests": adapter.total_requests,
+            "pools": pools,
+        }
+
+
+def build_cookie_header(cookies: dict) -> str:
+    """将 cookies 拼接为 Cookie 请求头，供共享的异步客户端按请求携带"""
+    return "; ".join(f"{key}={value}" for key, value in cookies.items() if value)
+
+
+class AsyncPooledHttpClient:
+    """
+    应用级共享的异步 keep-alive HTTP 客户端（httpx.AsyncClient）。
+
+    异步路由直接在事件循环中发起请求，不再占用线程池，并发阅读不受线程池大小限制。
+    由 FastAPI lifespan 负责关闭；首次使用时自动创建。
+    """
+
+    def __init__(self, pool_size: int, connect_timeout: float, read_timeout: float):
+        self.pool_size = pool_size
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._client = None
+        self.in_flight = 0
+        self.total_requests = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                headers=DEFAULT_HEADERS,
+                follow_redirects=True,
+            )
+            logger.info(f"共享异步 HTTP 客户端已启动，最大连接数 {self.pool_size}")
+        return self._client
+
+    async def aclose(self):
+        client, self._client = self._client, None
+        if client is not None and not client.is_closed:
+            await client.aclose()
+            logger.info("共享异步 HTTP 客户端已关闭")
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        self.in_flight += 1
+        self.total_requests += 1
+        try:
+            return await self.client.get(url, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+    async def stream(self, url: str, **kwargs) -> httpx.Response:
+        """
+        发起流式 GET 请求，收到响应头即返回；响应体由调用方逐块读取，结束后须调用 response.aclose() 归还连接
+        """
+        self.in_flight += 1
+        self.total_requests += 1
+        try:
+            client = self.client
+            return await client.send(client.build_request("GET", url, **kwargs), stream=True)
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        """返回连接池使用情况"""
+        client = self._client
+        if client is None or client.is_closed:
+            return {"started": False, "pool_size": self.pool_size}
+
+        connections = []
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        if pool is not None:
+            connections = list(getattr(pool, "connections", []))
+
+        return {
+            "started": True,
+            "pool_size": self.pool_size,
+            "timeout": {"connect": self.timeout.connect, "read": self.timeout.read},
+            "in_flight": self.in_flight,
+            "total_requests": self.total_requests,
+            "connections": len(connections),
+            "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+        }
+
+
+# ExHentai 相关请求共用的客户端实例
+exhentai_http_client = PooledHttpClient(
+    pool_size=settings.EX_HTTP_POOL_SIZE,
+    pool_hosts=settings.EX_HTTP_POOL_HOSTS,
+    connect_timeout=settings.EX_HTTP_CONNECT_TIMEOUT,
+    read_timeout=settings.REQUEST_TIMEOUT,
+)
+
+exhentai_async_client = AsyncPooledHttpClient(
+    pool_size=settings.EX_HTTP_POOL_SIZE,
+    connect_timeout=settings.EX_HTTP_CONNECT_TIMEOUT,
+    read_timeout=settings.REQUEST_TIMEOUT,
+)
@@ -0,0 +1,290 @@
+# app/utils/image_cache.py
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate
+from typing import Optional
+from urllib.parse import urlparse
+
+from core.config import settings
+from core.logger import get_logger
+from utils.single_flight import AsyncSingleFlight
+
+logger = get_logger(__name__)
+
+# H@H 图片地址中的文件标识：{sha1}-{大小}-{宽}-{高}-{格式}，与 keystamp 无关，
+# 同一张图片经不同节点、不同时间下发的地址都对应同一个缓存文件
+HATH_FILE_ID_PATTERN = re.compile(r"/(?:h|om)/([0-9a-f]{40}-\d+-\d+-\d+-[a-z0-9]+)(?:/|$)")
+
+# 只缓存 ExHentai 及其图片节点的图片
+CACHEABLE_IMAGE_DOMAINS = (".exhentai.org", ".e-hentai.org", ".hath.network")
+
+
+# 同一图片同时只下载一次（代理请求与阅读器预读共用），其余请求方等待写入磁盘缓存后直接读取
+image_download_flight = AsyncSingleFlight("image_download")
+
+
+def is_cacheable_image_url(url: str) -> bool:
+    hostname = urlparse(url).hostname or ""
+    return any(hostname == domain.lstrip(".") or hostname.endswith(domain) for domain in CACHEABLE_IMAGE_DOMAINS)
+
+
+class DiskImageCache:
+    """
+    磁盘图片缓存，按内容寻址。
+
+    - 键为 H@H 文件标识（无法识别时为 URL 的 SHA-256），文件按键名前两位分目录存放
+    - 每个图片旁保存一个 .json 元数据（Content-Type、ETag、Last-Modified）
+    - 先写入同目录临时文件再 os.replace，进程中断不会留下半个文件
+    - 总大小超过上限时按最近访问时间淘汰（LRU），访问时间通过文件 mtime 持久化
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        match = HATH_FILE_ID_PATTERN.search(url)
+        if match:
+            return match.group(1)
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def load(self):
+        """扫描缓存目录重建索引；目录较大时耗时较长，应在启动时于线程池中调用"""
+        with self._lock:
+            self._ensure_loaded()
+
+    def _ensure_loaded(self):
+        """首次使用时扫描缓存目录重建索引（正常情况下已在启动时由 load 完成）"""
+        if self._loaded:
+            return
+        entries = []
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if not name.endswith(".json") or name.startswith(".tmp-"):
+                        continue
+                    meta_path = os.path.join(root, name)
+                    data_path = meta_path[: -len(".json")]
+                    try:
+                        with open(meta_path, "r", encoding="utf-8") as f:
+                            meta = json.load(f)
+                        stat = os.stat(data_path)
+                    except (OSError, ValueError):
+                        continue
+                    meta.update(path=data_path, size=stat.st_size)
+                    entries.append((stat.st_mtime, os.path.basename(data_path), meta))
+
+        for _, key, meta in sorted(entries, key=lambda entry: entry[0]):
+            self._entries[key] = meta
+            self._total_bytes += meta["size"]
+        self._loaded = True
+        if entries:
+            logger.info(f"图片缓存索引已加载: {len(entries)} 项，{self._total_bytes / 1024 / 1024:.1f} MB")
+        self._evict()
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        查找缓存，命中时返回元数据（path、size、content_type、etag、last_modified），未命中返回 None
+        """
+        key = self.key_for(url)
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(key)
+            if entry is not None and not os.path.exists(entry["path"]):
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_saved += entry["size"]
+
+        try:
+            os.utime(entry["path"])
+        except OSError:
+            pass
+        return entry
+
+    def contains(self, url: str) -> bool:
+        """是否已缓存，不计入命中统计"""
+        with self._lock:
+            return self.key_for(url) in self._entries
+
+    def open_writer(self, url: str) -> Optional["CacheWriter"]:
+        """
+        打开一个写入器，可边下载边写入，commit 后才对其他请求可见；创建失败时返回 None
+        """
+        key = self.key_for(url)
+        try:
+            return CacheWriter(self, key, self._temp_path(key))
+        except OSError as e:
+            logger.warning(f"创建图片缓存文件失败: {e}")
+            return None
+
+    def _temp_path(self, key: str) -> str:
+        directory = os.path.dirname(self._path_for(key))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        os.close(fd)
+        return tmp_path
+
+    def _commit(self, key: str, tmp_path: str, content_type: str, last_modified: str = None) -> dict:
+        path = self._path_for(key)
+        meta = {
+            "content_type": content_type or "application/octet-stream",
+            "etag": f'"{key}"',
+            "last_modified": last_modified or formatdate(time.time(), usegmt=True),
+        }
+        meta_tmp = f"{tmp_path}.json"
+        try:
+            with open(meta_tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+            os.replace(meta_tmp, f"{path}.json")
+        except OSError:
+            if os.path.exists(meta_tmp):
+                os.remove(meta_tmp)
+            raise
+
+        entry = {**meta, "path": path, "size": size}
+        with self._lock:
+            self._ensure_loaded()
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old["size"]
+            self._entries[key] = entry
+            self._total_bytes += size
+            self._evict()
+        return entry
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry["size"]
+        for path in (entry["path"], f"{entry['path']}.json"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._drop(key)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        """返回命中率与节省的下载量"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.EX_IMAGE_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "evictions": self.evictions,
+        }
+
+
+class CacheWriter:
+    """DiskImageCache 的临时文件写入器"""
+
+    def __init__(self, cache: DiskImageCache, key: str, tmp_path: str):
+        self.cache = cache
+        self.key = key
+        self.tmp_path = tmp_path
+        self.file = open(tmp_path, "wb")
+        self.failed = False
+
+    def write(self, chunk: bytes):
+        """写入一段数据；写入失败时放弃缓存而不抛出异常，不影响正在进行的下载"""
+        if self.failed:
+            return
+        try:
+            self.file.write(chunk)
+        except OSError as e:
+            logger.warning(f"写入图片缓存失败: {e}")
+            self.abort()
+
+    def commit(self, content_type: str, last_modified: str = None) -> Optional[dict]:
+        """关闭临时文件并原子替换为缓存文件，失败时返回 None"""
+        if self.failed:
+            return None
+        try:
+            self.file.close()
+            return self.cache._commit(self.key, self.tmp_path, content_type, last_modified)
+        except OSError as e:
+            logger.warning(f"写入图片缓存失败: {e}")
+            self.abort()
+            return None
+
+    def abort(self):
+        """丢弃未完成的写入"""
+        self.failed = True
+        self.file.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class AsyncCacheWriter:
+    """
+    CacheWriter 的协程包装，供事件循环中的流式下载使用：文件操作在线程池中执行，
+    数据块先在内存中累积到 buffer_size 再写入，避免每个小数据块都切换一次线程
+    """
+
+    def __init__(self, writer: CacheWriter, buffer_size: int = 256 * 1024):
+        self.writer = writer
+        self.buffer_size = buffer_size
+        self._buffer = bytearray()
+
+    @classmethod
+    async def open(cls, cache: DiskImageCache, url: str) -> Optional["AsyncCacheWriter"]:
+        writer = await asyncio.to_thread(cache.open_writer, url)
+        return cls(writer) if writer is not None else None
+
+    async def write(self, chunk: bytes):
+        self._buffer += chunk
+        if len(self._buffer) >= self.buffer_size:
+            await self._flush()
+
+    async def _flush(self):
+        if self._buffer:
+            data, self._buffer = bytes(self._buffer), bytearray()
+            await asyncio.to_thread(self.writer.write, data)
+
+    async def commit(self, content_type: str, last_modified: str = None) -> Optional[dict]:
+        await self._flush()
+        return await asyncio.to_thread(self.writer.commit, content_type, last_modified)
+
+    async def abort(self):
+        self._buffer = bytearray()
+        await asyncio.to_thread(self.writer.abort)
+
+
+image_cache = DiskImageCache(settings.EX_IMAGE_CACHE_PATH, settings.EX_IMAGE_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,61 @@
+# app/utils/ocr_result_cache.py
+
+import hashlib
+import json
+from typing import Dict, List, Optional, Union
+
+from core.config import settings
+from utils.sqlite_cache import SQLiteLRUCache
+
+
+class OCRResultCache(SQLiteLRUCache):
+    """
+    OCR 识别结果的持久化缓存（SQLite）。
+
+    - 键为图片内容的 SHA-256 + OCR 引擎参数，同一张图片无论经哪个地址下载都能命中
+    - 保存未按置信度过滤、未合并对话框的原始结果，不同置信度阈值共用同一条记录
+    - 最近使用的结果同时保留在内存 LRU 中，可在启动时从数据库预热
+    - 淘汰、访问时间写回与错误处理见 SQLiteLRUCache
+    """
+
+    label = "OCR 结果缓存"
+    table = "ocr_results"
+    key_columns = ("image_hash", "params_key")
+    value_columns = ("results",)
+    read_column = "results"
+
+    def __init__(self, path: str, max_entries: int, memory_size: int, enabled: bool = True, warm_on_startup: bool = False):
+        super().__init__(path, max_entries, memory_size, enabled)
+        self.warm_on_startup = warm_on_startup
+
+    @staticmethod
+    def hash_image(image_source: Union[bytes, str]) -> str:
+        """计算图片内容的 SHA-256，image_source 为图片字节或本地文件路径"""
+        if isinstance(image_source, bytes):
+            return hashlib.sha256(image_source).hexdigest()
+        digest = hashlib.sha256()
+        with open(image_source, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _decode(self, raw: str) -> List[Dict]:
+        return json.loads(raw)
+
+    def get(self, image_hash: str, params_key: str) -> Optional[List[Dict]]:
+        """查找识别结果，未命中返回 None"""
+        key = (image_hash, params_key)
+        return self.get_many([key]).get(key)
+
+    def set(self, image_hash: str, params_key: str, results: List[Dict]):
+        """写入识别结果，超出上限时淘汰最久未访问的条目"""
+        self._set_many({(image_hash, params_key): (results, (json.dumps(results, ensure_ascii=False),))})
+
+
+ocr_result_cache = OCRResultCache(
+    settings.OCR_RESULT_CACHE_PATH,
+    settings.OCR_RESULT_CACHE_MAX_ENTRIES,
+    settings.OCR_RESULT_CACHE_MEMORY_SIZE,
+    enabled=settings.OCR_RESULT_CACHE_ENABLED,
+    warm_on_startup=settings.OCR_RESULT_CACHE_WARM_ON_STARTUP,
+)
@@ -0,0 +1,37 @@
+# app/utils/rate_limiter.py
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限流器。
+
+    参数:
+        rate: 每秒补充的令牌数，<= 0 表示不限流
+        capacity: 桶容量，即允许的最大突发请求数
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """获取一个令牌，令牌不足时阻塞等待"""
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
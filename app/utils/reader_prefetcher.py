@@ -0,0 +1,149 @@
+# app/utils/reader_prefetcher.py
+
+import asyncio
+
+from core.config import settings
+from core.logger import get_logger
+from utils.exhentai_utils import image_info_cache
+from utils.image_cache import AsyncCacheWriter, image_cache, image_download_flight, is_cacheable_image_url
+
+logger = get_logger(__name__)
+
+
+class _ReaderState:
+    """单个画廊的阅读位置与对应的预读任务"""
+
+    def __init__(self, page: int, total_pages: int):
+        self.page = page
+        self.total_pages = total_pages
+        self.task = None
+
+
+class ReadAheadPrefetcher:
+    """
+    阅读器预读调度器。
+
+    用户打开第 N 页后，在后台依次解析第 N+1..N+depth 页的大图信息（写入 image_info_cache），
+    并将图片下载到磁盘缓存，翻页时图片代理直接返回缓存文件。图片下载与代理请求共用 image_download_flight，
+    同一图片不会重复下载。每个画廊同时只有一个预读任务：顺序翻页时沿用当前任务并向后扩展预读窗口，
+    跳转到窗口之外时取消进行中的预读（包括正在进行的上游请求）并从新位置重新开始。
+    """
+
+    def __init__(self, depth: int):
+        self.depth = depth
+        self._readers = {}
+        self.prefetched = 0
+        self.images_cached = 0
+        self.cancelled = 0
+
+    def schedule(self, utils, gid: str, token: str, page: int, total_pages: int = 0):
+        """
+        记录阅读位置并安排预读
+
+        参数:
+            utils: AsyncExHentaiUtils 实例
+            page: 当前页码，从1开始
+            total_pages: 图片总数，未知时为0
+        """
+        if self.depth <= 0:
+            return
+
+        key = (str(gid), token)
+        reader = self._readers.get(key)
+        if reader is not None and not reader.task.done():
+            if page == reader.page:
+                return
+            if reader.page < page <= reader.page + self.depth:
+                # 顺序阅读，正在运行的任务会读取新位置继续预读
+                reader.page = page
+                reader.total_pages = total_pages or reader.total_pages
+                return
+            reader.task.cancel()
+            self.cancelled += 1
+
+        reader = _ReaderState(page, total_pages)
+        reader.task = asyncio.create_task(self._run(utils, key, reader))
+        self._readers[key] = reader
+
+    async def _run(self, utils, key: tuple, reader: _ReaderState):
+        gid, token = key
+        fetched = set()
+        try:
+            while True:
+                last = reader.page + self.depth
+                if reader.total_pages:
+                    last = min(last, reader.total_pages)
+
+                target = next((p for p in range(reader.page + 1, last + 1) if p not in fetched), None)
+                if target is None:
+                    return
+
+                fetched.add(target)
+                cached = image_info_cache.get((gid, token, target)) is not None
+                result = await utils.fetch_full_image(gid, token, target)
+                if result.get("error"):
+                    return
+                reader.total_pages = result.get("totalPages") or reader.total_pages
+                if not cached:
+                    self.prefetched += 1
+                await self._download_image(utils, result["imageUrl"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"预读失败 {gid}: {e}")
+        finally:
+            if self._readers.get(key) is reader:
+                del self._readers[key]
+
+    async def _download_image(self, utils, url: str):
+        """将图片下载到磁盘缓存；已缓存或正由其他请求下载时跳过"""
+        if not settings.EX_IMAGE_CACHE_ENABLED or not is_cacheable_image_url(url) or image_cache.contains(url):
+            return
+
+        key = image_cache.key_for(url)
+        leader, claim = image_download_flight.claim(key)
+        if not leader:
+            return
+
+        upstream = writer = None
+        completed = False
+        try:
+            upstream = await utils.http.stream(url, headers={"Cookie": utils.cookie_header})
+            upstream.raise_for_status()
+            writer = await AsyncCacheWriter.open(image_cache, url)
+            if writer is None:
+                return
+            async for chunk in upstream.aiter_bytes(settings.STREAM_CHUNK_SIZE):
+                await writer.write(chunk)
+            entry = await writer.commit(upstream.headers.get("content-type", "image/jpeg"), upstream.headers.get("last-modified"))
+            completed = entry is not None
+            if completed:
+                self.images_cached += 1
+        finally:
+            # 被取消（跳页、关闭服务）时同样关闭上游连接并丢弃未完成的文件
+            try:
+                if upstream is not None:
+                    await upstream.aclose()
+                if writer is not None and not completed:
+                    await writer.abort()
+            finally:
+                image_download_flight.release(key, claim)
+
+    def cancel_all(self):
+        """取消全部进行中的预读任务"""
+        for reader in list(self._readers.values()):
+            reader.task.cancel()
+        self._readers.clear()
+
+    def stats(self) -> dict:
+        """返回预读任务统计"""
+        return {
+            "depth": self.depth,
+            "active_readers": len(self._readers),
+            "prefetched": self.prefetched,
+            "images_cached": self.images_cached,
+            "cancelled": self.cancelled,
+        }
+
+
+reader_prefetcher = ReadAheadPrefetcher(settings.EX_PREFETCH_DEPTH)
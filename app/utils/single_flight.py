@@ -0,0 +1,137 @@
+# app/utils/single_flight.py
+
+import asyncio
+import threading
+from typing import Dict, Optional, Tuple
+
+# 所有实例，供状态接口汇总去重统计
+_groups: Dict[str, object] = {}
+
+
+class SingleFlight:
+    """
+    线程版请求合并：相同 key 的并发调用只执行一次 func，其余调用等待并共享同一个结果（或异常）。
+    结果对象在调用方之间共享，调用方不应修改。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.deduplicated = 0
+        _groups[name] = self
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"event": threading.Event(), "result": None, "error": None}
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = func(*args, **kwargs)
+            return call["result"]
+        except BaseException as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["event"].set()
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "deduplicated": self.deduplicated, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """
+    协程版请求合并。
+
+    - do(): 相同 key 的并发调用共享同一个后台任务的结果；某个调用方被取消（如客户端断开）不影响其他调用方，
+      所有调用方都已取消时才取消任务本身，不再为无人等待的结果继续请求上游
+    - claim()/release(): 供无法包装成单个协程的场景（如边下载边转发的图片代理）手动标记进行中的请求；
+      认领以 claim() 返回的完成信号标识，release() 只移除调用方自己的认领
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tasks = {}
+        self._waiters = {}
+        self._claims = {}
+        self.calls = 0
+        self.deduplicated = 0
+        _groups[name] = self
+
+    async def do(self, key, func, *args, **kwargs):
+        self.calls += 1
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._task_done(key, t))
+        else:
+            self.deduplicated += 1
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                # 任务未完成而等待者已全部离开，只可能是调用方都被取消了
+                if not task.done():
+                    task.cancel()
+
+    def _task_done(self, key, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            # 标记异常已被读取，避免所有调用方都已取消时输出 "exception was never retrieved"
+            task.exception()
+
+    def claim(self, key, stale: Optional[asyncio.Future] = None) -> Tuple[bool, asyncio.Future]:
+        """
+        认领 key。返回 (是否为首个请求方, 完成信号)；首个请求方完成后必须调用 release(key, 完成信号)，
+        其余请求方等待完成信号后再读取首个请求方留下的结果（如磁盘缓存）。
+
+        参数:
+            stale: 调用方等待超时的完成信号。key 仍由该认领占用时视其已失效，由调用方接替成为首个请求方；
+                原首个请求方之后的 release 不会影响接替者
+        """
+        self.calls += 1
+        future = self._claims.get(key)
+        if future is not None and future is not stale:
+            self.deduplicated += 1
+            return False, future
+        future = self._claims[key] = asyncio.get_running_loop().create_future()
+        return True, future
+
+    def release(self, key, future: asyncio.Future):
+        """结束 claim() 返回的认领并唤醒其等待者；认领已被接替时不移除接替者的认领"""
+        if self._claims.get(key) is future:
+            del self._claims[key]
+        if not future.done():
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self._tasks) + len(self._claims),
+        }
+
+
+def single_flight_stats() -> dict:
+    """返回所有请求合并分组的统计"""
+    return {name: group.stats() for name, group in _groups.items()}
@@ -0,0 +1,256 @@
+# app/utils/sqlite_cache.py
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Tuple
+
+from core.logger import get_logger
+from utils.ttl_cache import TTLCache
+
+logger = get_logger(__name__)
+
+# SQLite 单条语句的参数数量有限，批量查询按此大小分块
+_QUERY_CHUNK_SIZE = 500
+
+# 命中时只在内存中记录访问时间，积累到此数量（或写入、关闭时）再批量写回数据库
+_TOUCH_FLUSH_SIZE = 256
+
+
+class SQLiteLRUCache:
+    """
+    内存 LRU + SQLite 的持久化缓存基类。
+
+    - 条目数超过上限时按最近访问时间淘汰，同时从内存 LRU 中移除被淘汰的条目
+    - 命中时不立即写库，访问时间攒批后写回
+    - 数据库读写失败只记录日志并按未命中处理
+
+    子类通过类属性描述表结构：
+        label: 日志中的缓存名称
+        table: 表名
+        key_columns: 主键列，单列时键为该列的值，多列时键为各列值组成的元组
+        value_columns: 写入的值列
+        read_column: 读取时返回的列，经 _decode 转换后作为缓存值
+    """
+
+    label = ""
+    table = ""
+    key_columns: Tuple[str, ...] = ()
+    value_columns: Tuple[str, ...] = ()
+    read_column = ""
+
+    def __init__(self, path: str, max_entries: int, memory_size: int, enabled: bool = True):
+        self.path = path
+        self.max_entries = max_entries
+        self.enabled = enabled and max_entries > 0
+        self._memory = TTLCache(memory_size, 0)
+        self._conn = None
+        self._count = 0
+        self._touched = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._key_match = " AND ".join(f"{column} = ?" for column in self.key_columns)
+        self._key_list = ", ".join(self.key_columns)
+        self._key_tuple = f"({self._key_list})"
+        self._key_values = "(" + ", ".join("?" * len(self.key_columns)) + ")"
+        self._chunk_size = _QUERY_CHUNK_SIZE // len(self.key_columns)
+
+    def _decode(self, raw):
+        """将 read_column 的值转换为缓存值"""
+        return raw
+
+    def _params(self, key) -> tuple:
+        return key if len(self.key_columns) > 1 else (key,)
+
+    def _key(self, row: tuple):
+        """由以主键列开头的查询结果行取出键"""
+        return tuple(row[: len(self.key_columns)]) if len(self.key_columns) > 1 else row[0]
+
+    def _connect(self) -> sqlite3.Connection:
+        """调用方需持有 self._lock"""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = [f"{column} TEXT NOT NULL" for column in self.key_columns + self.value_columns]
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    {", ".join(columns)},
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY {self._key_tuple}
+                )
+                """
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_accessed ON {self.table} (accessed_at)")
+            conn.commit()
+            self._count = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            self._conn = conn
+            logger.info(f"{self.label}已打开: {self.path}，{self._count} 项")
+        return self._conn
+
+    def _select_chunks(self, conn: sqlite3.Connection, columns: str, keys: list):
+        """按主键分块查询，逐块返回查询结果"""
+        for start in range(0, len(keys), self._chunk_size):
+            chunk = keys[start : start + self._chunk_size]
+            values = ", ".join([self._key_values] * len(chunk))
+            params = [param for key in chunk for param in self._params(key)]
+            yield conn.execute(
+                f"SELECT {columns} FROM {self.table} WHERE {self._key_tuple} IN (VALUES {values})", params
+            ).fetchall()
+
+    def get_many(self, keys: Iterable) -> Dict:
+        """批量查找，返回命中的 {键: 值}"""
+        keys = list(dict.fromkeys(key for key in keys if key))
+        if not self.enabled or not keys:
+            return {}
+
+        found = {}
+        for key in keys:
+            value = self._memory.get(key)
+            if value is not None:
+                found[key] = value
+
+        with self._lock:
+            missing = [key for key in keys if key not in found]
+            loaded = {}
+            if missing:
+                try:
+                    conn = self._connect()
+                    for rows in self._select_chunks(conn, f"{self._key_list}, {self.read_column}", missing):
+                        for row in rows:
+                            loaded[self._key(row)] = self._decode(row[-1])
+                except (sqlite3.Error, OSError, ValueError) as e:
+                    logger.warning(f"读取{self.label}失败: {e}")
+            found.update(loaded)
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+            self._touch(found)
+
+        for key, value in loaded.items():
+            self._memory.set(key, value)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key) if key else None
+
+    def _set_many(self, items: Dict[object, Tuple[object, tuple]]):
+        """批量写入，items 为 {键: (缓存值, 值列)}，超出上限时淘汰最久未访问的条目"""
+        items = {key: value for key, value in items.items() if key}
+        if not self.enabled or not items:
+            return
+
+        now = time.time()
+        columns = self.key_columns + self.value_columns + ("created_at", "accessed_at")
+        with self._lock:
+            try:
+                conn = self._connect()
+                existing = sum(len(rows) for rows in self._select_chunks(conn, "1", list(items)))
+                self._count += len(items) - existing
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})",
+                    [(*self._params(key), *row, now, now) for key, (_, row) in items.items()],
+                )
+                for key in items:
+                    self._touched.pop(key, None)
+                # 先写回访问时间，淘汰顺序才反映最近的命中
+                self._flush_touched(conn)
+                self._evict(conn)
+                conn.commit()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"写入{self.label}失败: {e}")
+                return
+
+        for key, (value, _) in items.items():
+            self._memory.set(key, value)
+
+    def _touch(self, keys: Iterable):
+        """记录访问时间，调用方需持有 self._lock"""
+        now = time.time()
+        for key in keys:
+            self._touched[key] = now
+        if len(self._touched) >= _TOUCH_FLUSH_SIZE:
+            try:
+                conn = self._connect()
+                self._flush_touched(conn)
+                conn.commit()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"写入{self.label}访问时间失败: {e}")
+
+    def _flush_touched(self, conn: sqlite3.Connection):
+        """将攒下的访问时间写回数据库（不提交），调用方需持有 self._lock"""
+        if not self._touched:
+            return
+        touched, self._touched = self._touched, {}
+        conn.executemany(
+            f"UPDATE {self.table} SET accessed_at = ? WHERE {self._key_match}",
+            [(accessed_at, *self._params(key)) for key, accessed_at in touched.items()],
+        )
+
+    def _evict(self, conn: sqlite3.Connection):
+        excess = self._count - self.max_entries
+        if excess <= 0:
+            return
+        evicted = conn.execute(
+            f"SELECT {self._key_list} FROM {self.table} ORDER BY accessed_at LIMIT ?", (excess,)
+        ).fetchall()
+        conn.executemany(f"DELETE FROM {self.table} WHERE {self._key_match}", evicted)
+        self._count -= len(evicted)
+        self.evictions += len(evicted)
+        for row in evicted:
+            self._memory.pop(self._key(row))
+
+    def warm(self) -> int:
+        """将最近访问的条目加载到内存 LRU，返回加载的条目数"""
+        if not self.enabled or self._memory.maxsize <= 0:
+            return 0
+
+        with self._lock:
+            try:
+                rows = self._connect().execute(
+                    f"SELECT {self._key_list}, {self.read_column} FROM {self.table} ORDER BY accessed_at DESC LIMIT ?",
+                    (self._memory.maxsize,),
+                ).fetchall()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"预热{self.label}失败: {e}")
+                return 0
+
+        # 按访问时间从旧到新写入，使最近访问的条目位于 LRU 末尾
+        for row in reversed(rows):
+            self._memory.set(self._key(row), self._decode(row[-1]))
+        logger.info(f"{self.label}已预热: {len(rows)} 项")
+        return len(rows)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._flush_touched(self._conn)
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"写入{self.label}访问时间失败: {e}")
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> dict:
+        """返回缓存命中情况"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "memory_entries": len(self._memory),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,61 @@
+# app/utils/translation_cache.py
+
+import hashlib
+import re
+import unicodedata
+from typing import Dict, Optional, Tuple
+
+from core.config import settings
+from utils.sqlite_cache import SQLiteLRUCache
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_source_text(text: str) -> str:
+    """归一化原文：NFKC（统一全角/半角字符）并合并连续空白"""
+    return _WHITESPACE_PATTERN.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def prompt_version(prompt: str) -> str:
+    """由 Prompt 内容生成版本号，修改 Prompt 后旧译文自动失效"""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+class TranslationCache(SQLiteLRUCache):
+    """
+    译文持久化缓存（内存 LRU + SQLite）。
+
+    - 键为 归一化原文 + 模型名 + Prompt 版本 + 目标语言 的 SHA-256
+    - 淘汰、访问时间写回与错误处理见 SQLiteLRUCache
+    """
+
+    label = "翻译缓存"
+    table = "translations"
+    key_columns = ("cache_key",)
+    value_columns = ("source_text", "translation")
+    read_column = "translation"
+
+    @staticmethod
+    def make_key(text: str, model: str, version: str, target_language: str) -> Optional[str]:
+        """生成缓存键，归一化后为空的文本不缓存，返回 None"""
+        normalized = normalize_source_text(text or "")
+        if not normalized:
+            return None
+        raw = "\x00".join((model, version, target_language, normalized))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def set_many(self, items: Dict[str, Tuple[str, str]]):
+        """批量写入译文，items 为 {键: (原文, 译文)}，超出上限时淘汰最久未访问的条目"""
+        self._set_many({key: (translation, (source, translation)) for key, (source, translation) in items.items()})
+
+    def set(self, key: Optional[str], source_text: str, translation: str):
+        if key:
+            self.set_many({key: (source_text, translation)})
+
+
+translation_cache = TranslationCache(
+    settings.TRANSLATION_CACHE_PATH,
+    settings.TRANSLATION_CACHE_MAX_ENTRIES,
+    settings.TRANSLATION_CACHE_MEMORY_SIZE,
+    enabled=settings.TRANSLATION_CACHE_ENABLED,
+)